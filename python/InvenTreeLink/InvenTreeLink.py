@@ -7,6 +7,7 @@ try:
     from .apper import apper
     from . import config
     from . import functions
+    from . import jobs
 
     # Create our addin definition object
     my_addin = apper.FusionApp(config.app_name, config.company_name, False)
@@ -110,8 +111,11 @@ try:
 
     if functions.load_config(ui) is False:
         ui.messageBox("Unable to load config.", config.app_name)
-    
-    functions.init_Fusion360()
+
+    # Network calls run off the UI thread
+    config.JOBS = jobs.JobExecutor(config.DEF_JOB_EVENT)
+    config.JOBS.start()
+    config.JOBS.submit(lambda job: functions.init_Fusion360())
 
 except:  # noqa: E722
     app = adsk.core.Application.get()
@@ -127,4 +131,10 @@ def run(context):
 
 
 def stop(context):
+    # workers must be done before the connection is closed, a running job would open it again
+    if config.JOBS:
+        config.JOBS.stop()
+        config.JOBS = None
+    functions.close_api()
+    functions.close_part_index()
     my_addin.stop_app()
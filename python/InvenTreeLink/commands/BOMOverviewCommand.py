@@ -6,7 +6,9 @@ import json
 
 from ..apper import apper
 from .. import config
+from .. import functions
 from .. import helpers
+from ..sync import SyncEngine
 
 
 # Class for a Fusion 360 Palette Command
@@ -36,6 +38,23 @@ class BomOverviewPaletteShowCommand(apper.PaletteCommandBase):
                 if palette:
                     helpers.get_cmd(ao, config.DEF_SEND_ONLINE_STATE).execute()
 
+            elif html_args.action in ('syncParts', 'syncRetry'):
+                if palette:
+                    if not config.SYNC:
+                        config.SYNC = SyncEngine(
+                            on_report=lambda report: self.on_sync_report(palette, report),
+                            on_progress=lambda value, message: helpers.send_progress(palette, value, message),
+                        )
+                    if html_args.action == 'syncRetry':
+                        config.SYNC.retry()
+                    else:
+                        config.SYNC.start(dry_run=data.get('dry_run', False))
+
+            elif html_args.action == 'cancelJobs':
+                config.JOBS.cancel_all()
+                if palette:
+                    helpers.send_progress(palette, 0, 'Cancelled')
+
             elif html_args.action == 'showPart':
                 selections = ao.ui.activeSelections
                 selections.clear()
@@ -53,6 +72,22 @@ class BomOverviewPaletteShowCommand(apper.PaletteCommandBase):
             config.app_tracking.capture_exception(_e)
             helpers.error()
 
+    def on_sync_report(self, palette, report):
+        """ shows the sync report and the new links in the palette """
+        palette.sendInfoToHTML('SyncReport', json.dumps(report))
+
+        if config.SYNC.results:
+            for a in config.BOM:
+                result = config.SYNC.results.get(a['id'])
+                if result and result['part']:
+                    a['status'] = result['part'].pk
+
+            patch = helpers.PaletteStream(palette, 'BomPatch')
+            patch.begin({'fields': config.PALETTE_FIELDS})
+            changed, removed = functions.palette_changes(config.BOM)
+            patch.extend(changed)
+            patch.end({'removed': removed, 'info': 'Sync finished'})
+
     # Handle any extra cleanup when user closes palette here
     def on_palette_close(self):
         pass
@@ -2,12 +2,12 @@ import adsk.core
 import adsk.fusion
 import adsk.cam
 
-import json
 from datetime import datetime
 
 from ..apper import apper
 from .. import config
 from .. import functions
+from .. import helpers
 
 
 class SendBomCommand(apper.Fusion360CommandBase):
@@ -25,23 +25,30 @@ class SendBomCommand(apper.Fusion360CommandBase):
                 )
 
                 start = datetime.now()
-                config.BOM = functions.extract_bom()
-                config.BOM_HIR = functions.make_component_tree()
-                body = ''.join(['<tr><td>%s</td><td>%s</td></tr>' % (a['name'], a['instances']) for a in config.BOM])
-                table_c = '<div class="overflow-auto"><table class="table table-sm table-striped table-hover"><thead><tr><th scope="col">Name</th><th scope="col">Count</th></tr></thead><tbody>{body}</tbody></table></div>'.format(body=body)
 
-                palette.sendInfoToHTML(
-                    config.DEF_SEND_BOM,
-                    '<p>{nbr} parts found in {time}</p>{table}'.format(
-                        nbr=len(config.BOM),
-                        table=table_c,
-                        time=datetime.now() - start
-                    )
-                )
-                palette.sendInfoToHTML(
-                    'SendTree',
-                    json.dumps(config.BOM_HIR)
-                )
+                # Stream the tree and the rows while the design is traversed
+                tree = helpers.PaletteStream(palette, 'Tree')
+                tree.begin()
+                rows = helpers.PaletteStream(palette, 'Bom')
+                rows.begin({'fields': config.PALETTE_FIELDS})
+                # The palette starts with an empty table - every row is new
+                config.PALETTE_STATE = {}
+
+                def add_row(row):
+                    values = functions.palette_row(row)
+                    config.PALETTE_STATE[row['id']] = values
+                    rows.append(values)
+
+                config.BOM, _, _ = functions.traverse_design(on_node=tree.append, on_row=add_row)
+                tree.end()
+
+                # Instance counts grew after the rows were sent - the palette updates them in place
+                changed, _ = functions.palette_changes(config.BOM)
+                rows.extend(changed)
+                rows.end({'info': '{nbr} parts found in {time}'.format(
+                    nbr=len(config.BOM),
+                    time=datetime.now() - start
+                )})
         except Exception as _e:
             config.app_tracking.capture_exception(_e)
             raise _e
@@ -5,36 +5,52 @@ import adsk.cam
 from ..apper import apper
 from .. import config
 from .. import functions
+from .. import helpers
 
 
 class SendBomOnlineCommand(apper.Fusion360CommandBase):
+    job = None
+
     def on_execute(self, command: adsk.core.Command, command_inputs: adsk.core.CommandInputs, args, input_values):
         try:
             # Get Reference to Palette
             ao = apper.AppObjects()
             palette = ao.ui.palettes.itemById(config.ITEM_PALETTE)
 
-            # Send message to the HTML Page
             if palette:
-                palette.sendInfoToHTML(
-                    config.DEF_SEND_BOM,
-                    '<br><br><br><div class="d-flex justify-content-center"><div class="spinner-border" role="status"><span class="visually-hidden">Loading...</span></div></div>'
-                )
+                # A newer refresh replaces a running one
+                if SendBomOnlineCommand.job:
+                    SendBomOnlineCommand.job.cancel()
 
-                # Work with it
-                inv_status = functions.inventree_get_part([a['id'] for a in config.BOM])
-                for a in config.BOM:
-                    a['status'] = inv_status[a['id']]
+                patch = helpers.PaletteStream(palette, 'BomPatch')
+                patch.begin({'fields': config.PALETTE_FIELDS})
 
-                body = ''.join(
-                    ['<tr><td>%s</td><td>%s</td><td>%s</td></tr>' % (a['name'], a['instances'], a['status']) for a in config.BOM]
-                )
-                table = '<div class="overflow-auto"><table class="table table-sm table-striped table-hover"><thead><tr><th scope="col">Name</th><th scope="col">Count</th><th scope="col">Is InvenTree</th></tr></thead><tbody>{body}</tbody></table></div>'.format(body=body)
+                def on_done(inv_status):
+                    SendBomOnlineCommand.job = None
+                    for a in config.BOM:
+                        a['status'] = inv_status.get(a['id'], a.get('status'))
 
-                palette.sendInfoToHTML(
-                    config.DEF_SEND_BOM,
-                    '{table}'.format(table=table)
+                    # Only rows that differ from what the palette shows are sent
+                    changed, removed = functions.palette_changes(config.BOM)
+                    patch.extend(changed)
+                    patch.end({
+                        'removed': removed,
+                        'info': '{nbr} rows changed'.format(nbr=len(changed) + len(removed)),
+                    })
+
+                # Work with it - the lookup runs in the background
+                SendBomOnlineCommand.job = config.JOBS.submit(
+                    self.fetch_status,
+                    [(a['id'], a['revision-id']) for a in config.BOM],
+                    on_done=on_done,
+                    on_progress=lambda value, message: helpers.send_progress(palette, value, message),
                 )
         except Exception as _e:
             config.app_tracking.capture_exception(_e)
             raise _e
+
+    @staticmethod
+    def fetch_status(job, components):
+        """ resolves the InvenTree status of components - runs on a worker thread """
+        job.progress(0, 'Loading InvenTree status for {nbr} parts...'.format(nbr=len(components)))
+        return functions.inventree_link_status(components)
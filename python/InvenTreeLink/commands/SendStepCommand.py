@@ -13,10 +13,7 @@ from .. import config
 
 class SendStepCommand(apper.Fusion360CommandBase):
 
-    @apper.lib_import(config.lib_path)
     def on_execute(self, command: adsk.core.Command, command_inputs: adsk.core.CommandInputs, args, input_values):
-        from inventree.part import PartAttachment
-
         try:
             ao = apper.AppObjects()
 
@@ -37,22 +34,14 @@ class SendStepCommand(apper.Fusion360CommandBase):
 
                 ao.ui.messageBox("File at {}, size: {}".format(temp_path, os.path.getsize(temp_path)))
 
-                part = functions.inventree_get_part(occ.component.id)
-
-                if part is False:
-                    ao.ui.messageBox("Part is not synced with InvenTree yet")
-                else:
-                    if PartAttachment.upload_attachment(
-                        functions.inv_api(),
-                        part.pk,
-                        attachment=temp_path,
-                        comment="STEP file generated by InvenTreeLink on {}, revision {}".format(datetime.now(), occ.component.revisionId)
-                    ) is False:
-                        ao.ui.messageBox("Failed to upload!")
-                    else:
-                        ao.ui.messageBox("Succesfully attached STEP file to Part {}".format(part.pk))
-
-                os.remove(temp_path)
+                # The upload runs in the background
+                config.JOBS.submit(
+                    self._upload_step,
+                    temp_path,
+                    occ.component.id,
+                    occ.component.revisionId,
+                    on_done=ao.ui.messageBox,
+                )
 
             else:
                 ao.ui.messageBox("Wrong number of entities selected: {}".format(ao.ui.activeSelections.count))
@@ -60,6 +49,29 @@ class SendStepCommand(apper.Fusion360CommandBase):
             config.app_tracking.capture_exception(_e)
             raise _e
 
+    @staticmethod
+    @apper.lib_import(config.lib_path)
+    def _upload_step(job, temp_path, fusion_id, revision_id):
+        """ attaches the STEP file to the linked part - runs on a worker thread, returns a status message """
+        from inventree.part import PartAttachment
+
+        try:
+            part = functions.inventree_get_part(fusion_id)
+
+            if part is False:
+                return "Part is not synced with InvenTree yet"
+
+            if PartAttachment.upload_attachment(
+                functions.inv_api(),
+                part.pk,
+                attachment=temp_path,
+                comment="STEP file generated by InvenTreeLink on {}, revision {}".format(datetime.now(), revision_id)
+            ) is False:
+                return "Failed to upload!"
+            return "Succesfully attached STEP file to Part {}".format(part.pk)
+        finally:
+            os.remove(temp_path)
+
     def _write_step(self, output_path, component: adsk.fusion.Component):
         file_path = output_path
         if os.path.exists(file_path):
@@ -7,7 +7,6 @@ from ..apper import apper
 from .. import config
 from .. import functions
 from .. import helpers
-from ..functions import Fusion360Parameters
 
 
 class ShowPartCommand(apper.Fusion360CommandBase):
@@ -21,12 +20,31 @@ class ShowPartCommand(apper.Fusion360CommandBase):
 
                 # Check to see what button was used
                 if arg_id in ('partSelection', 'button_refresh'):
-                    self.part_refresh(occ, inp, functions.inventree_get_part(occ.component.id))
+                    config.JOBS.submit(
+                        self.part_fetch,
+                        occ.component.id,
+                        arg_id == 'button_refresh',
+                        on_done=lambda result: self.part_refresh(occ, inp, *result),
+                    )
                 elif arg_id == 'button_create':
                     # make part
-                    part = self.part_create(occ, functions.config_ref(config.CFG_PART_CATEGORY))
-                    # refresh display
-                    self.part_refresh(occ, inp, part)
+                    part_kargs, parameters = self.part_details(occ)
+
+                    def on_done(result):
+                        part, category, error_msg = result
+                        if error_msg:
+                            ao.ui.messageBox(error_msg)
+                        # refresh display
+                        self.part_refresh(occ, inp, part, category)
+
+                    config.JOBS.submit(
+                        self.part_create,
+                        part_kargs,
+                        parameters,
+                        occ.component.id,
+                        occ.component.revisionId,
+                        on_done=on_done,
+                    )
                 elif arg_id == 'APITabBar':
                     pass
                 else:
@@ -41,44 +59,39 @@ class ShowPartCommand(apper.Fusion360CommandBase):
             if ao.ui.activeSelections.count == 1:
                 occ = adsk.fusion.Occurrence.cast(ao.ui.activeSelections[0].entity)
                 inp = args.command.commandInputs
-                part = functions.inventree_get_part(occ.component.id)
-
-                def getText(text_name, obj, item, data):
-                    # get value
-                    value = inp.itemById(text_name).text
-                    # compare
-                    if not getattr(obj, item) == value:
-                        data[item] = value
-
-                def getValue(text_name, obj, item, data):
-                    value = inp.itemById(text_name).value
-                    # compare
-                    if not getattr(obj, item) == value:
-                        data[item] = value
-
-                if part:
-                    _data = {}
-                    getText('text_part_name', part, 'name', _data)
-                    getText('text_part_ipn', part, 'IPN', _data)
-                    getText('text_part_description', part, 'description', _data)
-                    getText('text_part_notes', part, 'notes', _data)
-                    getText('text_part_keywords', part, 'keywords', _data)
-                    getValue('bool_part_virtual', part, 'virtual', _data)
-                    getValue('bool_part_template', part, 'is_template', _data)
-                    getValue('bool_part_assembly', part, 'assembly', _data)
-                    getValue('bool_part_component', part, 'component', _data)
-                    getValue('bool_part_trackable', part, 'trackable', _data)
-                    getValue('bool_part_purchaseable', part, 'purchaseable', _data)
-                    getValue('bool_part_salable', part, 'salable', _data)
-
-                    part.save(_data)
-                else:
-                    config.app_tracking.capture_message('part not found by reference', 'fatal')
-                    pass
+
+                # read the inputs here - the part is loaded and saved in the background
+                values = {
+                    'name': inp.itemById('text_part_name').text,
+                    'IPN': inp.itemById('text_part_ipn').text,
+                    'description': inp.itemById('text_part_description').text,
+                    'notes': inp.itemById('text_part_notes').text,
+                    'keywords': inp.itemById('text_part_keywords').text,
+                    'virtual': inp.itemById('bool_part_virtual').value,
+                    'is_template': inp.itemById('bool_part_template').value,
+                    'assembly': inp.itemById('bool_part_assembly').value,
+                    'component': inp.itemById('bool_part_component').value,
+                    'trackable': inp.itemById('bool_part_trackable').value,
+                    'purchaseable': inp.itemById('bool_part_purchaseable').value,
+                    'salable': inp.itemById('bool_part_salable').value,
+                }
+                config.JOBS.submit(self.part_save, occ.component.id, values)
         except Exception as _e:
             config.app_tracking.capture_exception(_e)
             pass
 
+    @staticmethod
+    def part_save(job, fusion_id, values):
+        """ saves changed values to the linked part - runs on a worker thread """
+        part = functions.inventree_get_part(fusion_id)
+
+        if part:
+            # compare
+            _data = {item: value for item, value in values.items() if not getattr(part, item) == value}
+            part.save(_data)
+        else:
+            config.app_tracking.capture_message('part not found by reference', 'fatal')
+
     def on_create(self, command, inputs):
         try:
             # Tabs
@@ -149,56 +162,45 @@ class ShowPartCommand(apper.Fusion360CommandBase):
             helpers.error()
 
     # cstm fnc
-    @apper.lib_import(config.lib_path)
-    def part_create(self, occ, cat):
-        """ create part based on occurence """
-        from inventree.part import Part
-
-        ao = apper.AppObjects()
-
-        # build up args
-        part_kargs = {
-            'name': occ.component.name,
-            'description': occ.component.description if occ.component.description else 'None',
-            'IPN': occ.component.partNumber,
-            'active': True,
-            'virtual': False,
-        }
-        # add category if set
-        if cat:
-            part_kargs.update({'category': cat.pk})
-        # create part itself
-        part = Part.create(functions.inv_api(), part_kargs)
-        # check if part created - else raise error
-        if not part:
-            ao.ui.messageBox('Error occured during API-call')
-            return
-        elif not part.pk:
-            error_detail = [f'<strong>{a}</strong>\n{b[0]}' for a, b in part._data.items()]
-            ao.ui.messageBox(f'Error occured:<br><br>{"<br>".join(error_detail)}')
-            return
-
-        Fusion360Parameters.ID.value.create_parameter(part, occ.component.id)
-        Fusion360Parameters.AREA.value.create_parameter(part, occ.physicalProperties.area)
-        Fusion360Parameters.VOLUME.value.create_parameter(part, occ.physicalProperties.volume)
-        Fusion360Parameters.MASS.value.create_parameter(part, occ.physicalProperties.mass)
-        Fusion360Parameters.DENSITY.value.create_parameter(part, occ.physicalProperties.density)
-
-        if occ.component.material and occ.component.material.name:
-            Fusion360Parameters.MATERIAL.value.create_parameter(part, occ.component.material.name)
-
-        axis = ['x', 'y', 'z']
-        bb_min = {a: getattr(occ.boundingBox.minPoint, a) for a in axis}
-        bb_max = {a: getattr(occ.boundingBox.maxPoint, a) for a in axis}
-        bb = {a: bb_max[a] - bb_min[a] for a in axis}
-
-        Fusion360Parameters.BOUNDING_BOX_WIDTH.value.create_parameter(part, bb["x"])
-        Fusion360Parameters.BOUNDING_BOX_HEIGHT.value.create_parameter(part, bb["y"])
-        Fusion360Parameters.BOUNDING_BOX_DEPTH.value.create_parameter(part, bb["z"])
-
-        return part
-
-    def part_refresh(self, occ, inp, part):
+    def part_details(self, occ):
+        """ collects part data and parameters of an occurence - must run on the UI thread """
+        return functions.part_details(occ.component, occ)
+
+    @staticmethod
+    def part_create(job, part_kargs, parameters, fusion_id, revision_id):
+        """ create part based on occurence data - runs on a worker thread
+
+        returns the part, its category path and an error message
+        """
+        part, category, errors = functions.create_part(job, part_kargs, parameters, fusion_id, revision_id)
+
+        error_msg = None
+        if errors:
+            error_detail = [f'<strong>{a}</strong>\n{b}' for a, b in errors]
+            if part:
+                error_msg = f'Part created, but parameters failed:<br><br>{"<br>".join(error_detail)}'
+            else:
+                error_msg = f'Error occured:<br><br>{"<br>".join(error_detail)}'
+        return part, category, error_msg
+
+    @staticmethod
+    def part_fetch(job, fusion_id, reload=False):
+        """ returns the linked part and its category path - runs on a worker thread
+
+        parts and categories that were loaded before are reused unless reload is set
+        """
+        part = functions.inventree_get_part(fusion_id, reload)
+        job.check()
+
+        category = ''
+        if part and part.category:
+            category = part.getCategory()
+            if reload:
+                category.reload()
+            category = category.pathstring
+        return part, category
+
+    def part_refresh(self, occ, inp, part, category=''):
         """ updates PartInfo command-inputs with values for supplied parts """
         ao = apper.AppObjects()
         unitsMgr = ao.f_units_manager
@@ -264,7 +266,7 @@ class ShowPartCommand(apper.Fusion360CommandBase):
             setText('text_part_description', part.description)
             setText('text_part_notes', part.notes)
             setText('text_part_keywords', part.keywords)
-            setText('text_part_category', part.getCategory().pathstring)
+            setText('text_part_category', category)
             # setText('text_part_stock', part.in_stock)  # TODO fix
             inp.itemById('bool_part_virtual').value = part.virtual
             inp.itemById('bool_part_template').value = part.is_template
@@ -20,14 +20,39 @@ DEF_SEND_BOM = "SendBom"
 DEF_SEND_ONLINE_STATE = "SendOnlineState"
 DEF_SEND_PART = "SendPart"
 DEF_SEND_STEP = "SendStep"
+DEF_JOB_EVENT = "InvenTreeLinkJobs"
+
+PALETTE_CHUNK_SIZE = 250  # items per palette message
+PALETTE_FIELDS = ('id', 'name', 'instances', 'status')  # columns of a palette bom row
 
 CFG_ADDRESS = 'address'
 CFG_TOKEN = 'token'
 CFG_PART_CATEGORY = 'part_category'
+CFG_POOL_CONNECTIONS = 'pool_connections'
+CFG_POOL_MAXSIZE = 'pool_maxsize'
+CFG_MAX_RETRIES = 'max_retries'
+CFG_INDEX_MAX_AGE = 'index_max_age'
+CFG_INDEX_LINKED_MAX_AGE = 'index_linked_max_age'
+CFG_MAX_CONCURRENCY = 'max_concurrency'
+CFG_PAGE_SIZE = 'page_size'
+CFG_REF_MAX_AGE = 'ref_max_age'
+CFG_CACHE_SIZE = 'cache_size'
+CFG_CACHE_DISK_ENTRIES = 'cache_disk_entries'
+CFG_IDENTITY_MAP_SIZE = 'identity_map_size'
+CFG_TIMEOUT = 'timeout'
+CFG_CIRCUIT_FAILURES = 'circuit_failures'
+CFG_CIRCUIT_TIMEOUT = 'circuit_timeout'
+CFG_RATE_LIMIT = 'rate_limit'
+CFG_RATE_BURST = 'rate_burst'
+CFG_MAX_IN_FLIGHT = 'max_in_flight'
 
 # globals for reference
 BOM = []  # BOM-List
-BOM_HIR = []  # Hirarchical BOM
+PALETTE_STATE = {}  # palette rows as last sent, by component id
 INV_API = None  # API-connection
+INV_AIO = None  # async API-connection
+PART_INDEX = None  # persistent id-index
+JOBS = None  # background job executor
+SYNC = None  # bulk part creation
 CONFIG = {}  # Config section
-REF_CACHE = {}  # saves refs for reduced loading
+REF_CACHE = {}  # saves refs for reduced loading - ref: ((server, name), expires, object)
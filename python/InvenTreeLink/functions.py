@@ -2,12 +2,16 @@ import adsk.core
 import adsk.fusion
 import adsk.cam
 
+import asyncio
 import configparser
 import os
+import threading
+import time
 from enum import Enum
 
 from .apper import apper
 from . import config
+from .part_index import PartIndex
 
 
 class Fusion360Template:
@@ -57,6 +61,8 @@ class Fusion360Template:
 
     @property
     def pk(self):
+        if self.name not in Fusion360Template.__PART_TEMPLATE_CACHE:
+            init_Fusion360()
         return Fusion360Template.__PART_TEMPLATE_CACHE[self.name].pk
 
 
@@ -74,21 +80,26 @@ class Fusion360Parameters(Enum):
     BOUNDING_BOX_DEPTH = Fusion360Template(Fusion360Template.BOUNDING_BOX_BASE + "Depth", "cm")
 
 
+_INIT_LOCK = threading.Lock()
+
+
 @apper.lib_import(config.lib_path)
 def init_Fusion360():
     from inventree.base import ParameterTemplate
 
-    existing = [parameter.name for parameter in ParameterTemplate.list(inv_api())]
-    for variant in Fusion360Parameters:
-        template = variant.value
+    # may be called from several worker threads - templates must only be created once
+    with _INIT_LOCK:
+        existing = [parameter.name for parameter in ParameterTemplate.list(inv_api(), fields=['name'])]
+        for variant in Fusion360Parameters:
+            template = variant.value
 
-        if template.name in existing:
-            continue
+            if template.name in existing:
+                continue
 
-        template.create_template()
-        print("Created non-existing parameter template " + template.name)
+            template.create_template()
+            print("Created non-existing parameter template " + template.name)
 
-    Fusion360Template.cache_part_templates(ParameterTemplate.list(inv_api()))
+        Fusion360Template.cache_part_templates(ParameterTemplate.list(inv_api(), fields=['name']))
 
 
 # region tracking
@@ -197,6 +208,15 @@ def config_get(ref):
     raise NotImplementedError('unknown ref')
 
 
+def config_get_int(ref, default):
+    """ returns an optional integer from the current config """
+    crt_srv = config.CONFIG['SERVER']['current']
+    return config.CONFIG[crt_srv].getint(ref, fallback=default)
+
+
+_REF_LOCK = threading.Lock()
+
+
 @apper.lib_import(config.lib_path)
 def config_ref(ref):
     """ retuns a (cached) api-object based on ref """
@@ -205,14 +225,25 @@ def config_ref(ref):
 
     def get(ref, cat):
         """ handles caching of ref-objects """
-        if config.REF_CACHE.get(ref):
-            return config.REF_CACHE.get(ref)
-
-        ref_vals = [category for category in cat.list(inv_api()) if category.name == config_get(ref)]
-        if ref_vals:
-            config.REF_CACHE[ref] = ref_vals[0]
-            return config.REF_CACHE[ref]
-        return None
+        name = config_get(ref)
+        # entries are only valid for the server section and name they were resolved for
+        key = (config.CONFIG['SERVER']['current'], name)
+
+        with _REF_LOCK:
+            cached = config.REF_CACHE.get(ref)
+            if cached and cached[0] == key and cached[1] > time.time():
+                return cached[2]
+
+            # let the server filter by name - the exact match is checked here as search also matches substrings
+            ref_vals = [
+                item for item in cat.list(inv_api(), fields=['name', 'pathstring'], name=name, search=name) or []
+                if item.name == name
+            ]
+            if ref_vals:
+                config.REF_CACHE[ref] = (key, time.time() + config_get_int(config.CFG_REF_MAX_AGE, 3600), ref_vals[0])
+                return ref_vals[0]
+            config.REF_CACHE.pop(ref, None)
+            return None
 
     # set the API-objects
     if ref == config.CFG_PART_CATEGORY:
@@ -225,91 +256,434 @@ def config_ref(ref):
 
 
 # region API
+_API_LOCK = threading.Lock()
+
+
 @apper.lib_import(config.lib_path)
 def inv_api():
     """ connect to API """
     from inventree.api import InvenTreeAPI
-
-    if not config.INV_API:
-        config.INV_API = InvenTreeAPI(config_get('srv_address'), token=config_get('srv_token'))
+    from inventree.base import IdentityMap
+    from inventree.cache import ResponseCache
+    from inventree.part import Part, PartCategory
+    from inventree.retry import CircuitBreaker
+    from inventree.throttle import Throttle
+
+    with _API_LOCK:
+        if not config.INV_API:
+            # unchanged responses are revalidated instead of downloaded again
+            cache = None
+            cache_size = config_get_int(config.CFG_CACHE_SIZE, 256)
+            if cache_size:
+                disk_entries = config_get_int(config.CFG_CACHE_DISK_ENTRIES, 0)
+                cache = ResponseCache(
+                    cache_size,
+                    path=os.path.join(config.app_path, 'response_cache.db') if disk_entries else None,
+                    max_disk_entries=disk_entries,
+                )
+
+            # stop waiting on a server that is down - requests fail fast until it answers again
+            circuit_breaker = None
+            circuit_failures = config_get_int(config.CFG_CIRCUIT_FAILURES, 5)
+            if circuit_failures:
+                circuit_breaker = CircuitBreaker(circuit_failures, config_get_int(config.CFG_CIRCUIT_TIMEOUT, 30))
+
+            # keep bulk operations from overloading a server shared with other workstations
+            throttle = None
+            rate_limit = config_get_int(config.CFG_RATE_LIMIT, 0)
+            max_in_flight = config_get_int(config.CFG_MAX_IN_FLIGHT, 0)
+            if rate_limit or max_in_flight:
+                throttle = Throttle(rate_limit, config_get_int(config.CFG_RATE_BURST, 0), max_in_flight)
+
+            config.INV_API = InvenTreeAPI(
+                config_get('srv_address'),
+                token=config_get('srv_token'),
+                pool_connections=config_get_int(config.CFG_POOL_CONNECTIONS, 4),
+                pool_maxsize=config_get_int(config.CFG_POOL_MAXSIZE, 10),
+                max_retries=config_get_int(config.CFG_MAX_RETRIES, 2),
+                timeout=config_get_int(config.CFG_TIMEOUT, 30) or None,
+                circuit_breaker=circuit_breaker,
+                throttle=throttle,
+                cache=cache,
+                # parts and categories are loaded once and shared - the refresh button reloads them
+                identity_map=IdentityMap(config_get_int(config.CFG_IDENTITY_MAP_SIZE, 1024), models=(Part, PartCategory)),
+            )
         return config.INV_API
-    return config.INV_API
 
 
 @apper.lib_import(config.lib_path)
-def inventree_get_part(part_id):
-    """ returns a part from InvenTree """
-    from inventree.part import Part
+def inv_aio():
+    """ async API-connection sharing the pooled connections of inv_api """
+    from inventree.aio import AsyncInvenTreeAPI
+
+    api = inv_api()
+    with _API_LOCK:
+        if not config.INV_AIO:
+            config.INV_AIO = AsyncInvenTreeAPI(api, config_get_int(config.CFG_MAX_CONCURRENCY, 8))
+    return config.INV_AIO
+
+
+def close_api():
+    """ closes the API-connection and its pooled connections """
+    with _API_LOCK:
+        if config.INV_AIO:
+            config.INV_AIO.close(close_api=False)
+            config.INV_AIO = None
+        if config.INV_API:
+            # bytes received per endpoint (compressed / decoded) during this session
+            if config.INV_API.transfer.totals()['requests']:
+                print(config.INV_API.transfer.report())
+            # time spent waiting for the rate limit
+            if config.INV_API.throttle and config.INV_API.throttle.throttled:
+                print('throttled: {throttled} of {requests} requests, {throttled_seconds:.1f}s'.format(
+                    **config.INV_API.throttle.stats()
+                ))
+            config.INV_API.close()
+            config.INV_API = None
+
+
+@apper.lib_import(config.lib_path)
+def create_parameters(items):
+    """ creates parameters concurrently
+
+    items - list of (part, Fusion360Parameters-member, data)
+    returns a list of (part, Fusion360Parameters-member, error) for every item that failed
+    """
+    from inventree.base import Parameter
+
+    api = inv_aio()
+
+    async def create(payload):
+        try:
+            result = await api.create(Parameter, payload)
+            return None if result else 'not created by server'
+        except Exception as _e:
+            config.app_tracking.capture_exception(_e)
+            return str(_e)
+
+    async def create_all():
+        payloads = [{'part': part.pk, 'template': parameter.value.pk, 'data': data} for part, parameter, data in items]
+        return await asyncio.gather(*[create(payload) for payload in payloads])
+
+    errors = asyncio.run(create_all())
+    return [(*item, error) for item, error in zip(items, errors) if error]
+
+
+_INDEX_LOCK = threading.RLock()
+
+
+def part_index():
+    """ returns the persistent id-index for the current server """
+    crt_srv = config.CONFIG['SERVER']['current']
+
+    with _INDEX_LOCK:
+        if not config.PART_INDEX or config.PART_INDEX.server != crt_srv:
+            close_part_index()
+            config.PART_INDEX = PartIndex(
+                os.path.join(config.app_path, 'part_index.db'),
+                crt_srv,
+                config_get_int(config.CFG_INDEX_MAX_AGE, 3600),
+                config_get_int(config.CFG_INDEX_LINKED_MAX_AGE, 86400),
+            )
+        return config.PART_INDEX
+
+
+def close_part_index():
+    """ closes the persistent id-index """
+    with _INDEX_LOCK:
+        if config.PART_INDEX:
+            config.PART_INDEX.close()
+            config.PART_INDEX = None
+
+
+@apper.lib_import(config.lib_path)
+def inventree_id_index():
+    """ returns an index fusion-id -> part-pk of all linked parts """
+    from inventree.base import Parameter
+
+    # only fetch the values of the id-template - page by page so the whole list is never held at once
+    parameters = Parameter.list(
+        inv_api(),
+        fields=['part', 'data'],
+        page_size=config_get_int(config.CFG_PAGE_SIZE, 500),
+        lazy=True,
+        prefetch=True,
+        template=Fusion360Parameters.ID.value.pk,
+    )
+
+    index = {}
+    for parameter in parameters:
+        fusion_id = parameter._data['data']
+        # ids that are linked to more than one part are ambiguous
+        index[fusion_id] = None if fusion_id in index else parameter.part
+    if parameters.failed:
+        return None
+    return index
+
+
+@apper.lib_import(config.lib_path)
+def inventree_id_lookup(fusion_id):
+    """ returns the pk of the part linked to a single fusion-id (None if there is none)
+
+    only fetches the id-parameters with this value instead of the whole id-index
+    """
     from inventree.base import Parameter
 
-    def search(parameters, part_id):
+    # data is filtered locally as well, older servers ignore the filter
+    parameters = Parameter.list(
+        inv_api(),
+        fields=['part', 'data'],
+        template=Fusion360Parameters.ID.value.pk,
+        data=fusion_id,
+    )
+    if parameters is None:
+        # not knowing the link must not look like an unlinked part
+        raise ConnectionError('InvenTree server is not reachable')
+
+    parts = [parameter.part for parameter in parameters if parameter._data['data'] == fusion_id]
+    # ids that are linked to more than one part are ambiguous
+    return parts[0] if len(parts) == 1 else None
+
+
+@apper.lib_import(config.lib_path)
+def inventree_get_part(part_id, reload=False):
+    """ returns a part from InvenTree - reload fetches the current state of an already loaded part
+
+    the part data are fetched on first access, so callers that only need the pk do not wait for it
+    """
+    from inventree.part import Part
+
+    def get(part_pk):
         try:
-            part = [a.part for a in parameters if a._data['data'] == part_id]
-            if len(part) == 1:
-                return Part(inv_api(), part[0])
+            if part_pk:
+                part = Part(inv_api(), part_pk, lazy=True)
+                if reload:
+                    part.reload()
+                return part
             return False
         except Exception as _e:
             config.app_tracking.capture_exception(_e)
             raise Exception from _e
 
-    parameters = Parameter.list(inv_api())
-    if not parameters:
-        parameters = []
     if type(part_id) in (list, tuple):
+        index = inventree_id_index()
+        if index is None:
+            # not knowing the links must not look like an unlinked part
+            raise ConnectionError('InvenTree server is not reachable')
         result = {}
         for cur_id in part_id:
-            result[cur_id] = search(parameters, cur_id)
+            result[cur_id] = get(index.get(cur_id))
+        # load all parts with one request instead of one per part
+        Part.hydrate(inv_api(), [part for part in result.values() if part])
         return result
-    return search(parameters, part_id)
+
+    return get(inventree_id_lookup(part_id))
+
+
+def inventree_link_status(components, verify_unlinked=False):
+    """ returns fusion-id -> part-pk (False if not linked) for (fusion-id, revision-id) pairs
+
+    verify_unlinked - check components the index knows as unlinked against the server, they may have been
+    linked elsewhere in the meantime - the index is only used if the server is not reachable
+    """
+    index = part_index()
+
+    found, missing = index.lookup(components, unlinked=not verify_unlinked)
+    if not missing:
+        return found
+
+    id_index = inventree_id_index()
+    if id_index is None:
+        # server not reachable - use the last known state
+        found.update(index.offline(missing))
+        return found
+
+    index.update(components, id_index)
+    return {fusion_id: id_index.get(fusion_id) or False for fusion_id, _ in components}
+# endregion
+
+
+# region part creation
+def part_details(comp, geometry):
+    """ collects part data and parameters of a component - uses the Fusion API so must run on the UI thread
+
+    geometry - occurrence (or the component itself) to take physical properties and bounding box from
+    """
+    # build up args
+    part_kargs = {
+        'name': comp.name,
+        'description': comp.description if comp.description else 'None',
+        'IPN': comp.partNumber,
+        'active': True,
+        'virtual': False,
+    }
+
+    properties = geometry.physicalProperties
+    parameters = [
+        (Fusion360Parameters.ID, comp.id),
+        (Fusion360Parameters.AREA, properties.area),
+        (Fusion360Parameters.VOLUME, properties.volume),
+        (Fusion360Parameters.MASS, properties.mass),
+        (Fusion360Parameters.DENSITY, properties.density),
+    ]
+
+    if comp.material and comp.material.name:
+        parameters.append((Fusion360Parameters.MATERIAL, comp.material.name))
+
+    axis = ['x', 'y', 'z']
+    bb_min = {a: getattr(geometry.boundingBox.minPoint, a) for a in axis}
+    bb_max = {a: getattr(geometry.boundingBox.maxPoint, a) for a in axis}
+    bb = {a: bb_max[a] - bb_min[a] for a in axis}
+
+    parameters.append((Fusion360Parameters.BOUNDING_BOX_WIDTH, bb["x"]))
+    parameters.append((Fusion360Parameters.BOUNDING_BOX_HEIGHT, bb["y"]))
+    parameters.append((Fusion360Parameters.BOUNDING_BOX_DEPTH, bb["z"]))
+
+    return part_kargs, parameters
+
+
+@apper.lib_import(config.lib_path)
+def create_part(job, part_kargs, parameters, fusion_id, revision_id):
+    """ creates a part with its parameters - runs on a worker thread
+
+    returns the part (None if it was not created), its category path and a list of (field, error)
+    """
+    from inventree.part import Part
+
+    # add category if set
+    cat = config_ref(config.CFG_PART_CATEGORY)
+    if cat:
+        part_kargs = dict(part_kargs, category=cat.pk)
+    # create part itself
+    part = Part.create(inv_api(), part_kargs)
+    # check if part created - else return error
+    if not part:
+        return None, '', [('part', 'Error occured during API-call')]
+    elif not part.pk:
+        return None, '', [(a, b[0]) for a, b in part._data.items()]
+
+    return part, cat.pathstring if cat else '', link_part(part, parameters, fusion_id, revision_id)
+
+
+def link_part(part, parameters, fusion_id, revision_id):
+    """ creates parameters of a part and records the link once the id-parameter exists - runs on a worker thread
+
+    returns a list of (field, error)
+    """
+    # all parameters are sent at once
+    errors = create_parameters([(part, parameter, data) for parameter, data in parameters])
+    if not any(parameter is Fusion360Parameters.ID for _, parameter, _ in errors):
+        part_index().record(fusion_id, revision_id, part.pk)
+
+    return [(a.value.name, b) for _, a, b in errors]
+
+
+@apper.lib_import(config.lib_path)
+def find_created_part(part_kargs, fusion_id):
+    """ returns the part an earlier create_part call created for a component (None if there is none)
+
+    a request that timed out may still have been committed by the server, so the part is looked up
+    by its id-parameter and - if the parameters were not created - by name and IPN of unlinked parts
+    """
+    from inventree.base import Parameter
+    from inventree.part import Part
+
+    api = inv_api()
+    template = Fusion360Parameters.ID.value.pk
+
+    # data is filtered locally as well, older servers ignore the filter
+    linked = Parameter.list(api, fields=['part', 'data'], template=template, data=fusion_id)
+    if linked is None:
+        raise ConnectionError('InvenTree server is not reachable')
+    for parameter in linked:
+        if parameter._data['data'] == fusion_id:
+            return Part(api, parameter.part, lazy=True)
+
+    candidates = Part.list(api, fields=['name', 'IPN'], search=part_kargs['name'])
+    if candidates is None:
+        raise ConnectionError('InvenTree server is not reachable')
+    for candidate in candidates:
+        if candidate.name != part_kargs['name'] or (candidate.IPN or '') != (part_kargs['IPN'] or ''):
+            continue
+        ids = Parameter.list(api, fields=['part'], template=template, part=candidate.pk)
+        if ids is None:
+            raise ConnectionError('InvenTree server is not reachable')
+        # parts linked to another component are not ours
+        if not [parameter for parameter in ids if parameter.part == candidate.pk]:
+            return candidate
+    return None
+
+
+@apper.lib_import(config.lib_path)
+def recover_part(job, part_kargs, parameters, fusion_id, revision_id):
+    """ retries create_part without creating a part twice - runs on a worker thread
+
+    returns the same as create_part
+    """
+    from inventree.base import Parameter
+
+    part = find_created_part(part_kargs, fusion_id)
+    if part is None:
+        return create_part(job, part_kargs, parameters, fusion_id, revision_id)
+
+    # only the parameters the part does not have yet
+    existing = Parameter.list(inv_api(), fields=['template'], part=part.pk)
+    if existing is None:
+        raise ConnectionError('InvenTree server is not reachable')
+    templates = {parameter.template for parameter in existing}
+    missing = [(parameter, data) for parameter, data in parameters if parameter.value.pk not in templates]
+
+    return part, '', link_part(part, missing, fusion_id, revision_id)
 # endregion
 
 
 # region bom functions
-def extract_bom():
-    """ returns bom """
+def traverse_design(levels=False, on_node=None, on_row=None, max_depth=None):
+    """ walks the occurrence graph once - returns the flat bom, the tree nodes and the instance counts
+
+    levels - also count instances per assembly level ('levels', totals) and per parent component
+    ('parents', the quantity in one instance of the parent)
+    on_node - called with each tree node as soon as it is found, instead of collecting the nodes
+    on_row - called with each bom row when its component is first found - the instance count is still growing
+    max_depth - do not descend below this assembly level - the bom then only holds the upper levels
+    """
     try:
         ao = apper.AppObjects()
         design = ao.product
         if not design:
             ao.ui.messageBox('No active design', 'Extract BOM')
-            return []
-
-        # Get all occurrences in the root component of the active design
-        occs = design.rootComponent.allOccurrences
-
-        # Gather information about each unique component
-        bom = []
-        for occ in occs:
-            comp = occ.component
-            jj = 0
-            for bomI in bom:
-                if bomI['component'] == comp:
-                    # Increment the instance count of the existing row.
-                    bomI['instances'] += 1
-                    break
-                jj += 1
-
-            if jj == len(bom):
-                # Gather any BOM worthy values from the component
-                volume = 0
-                bodies = comp.bRepBodies
-                for bodyK in bodies:
-                    if bodyK.isSolid:
-                        volume += bodyK.volume
-
-                # Add this component to the BOM
-                node = component_info(comp, comp_set=True)
-                node['volume'] = volume
-                node['linked'] = occ.isReferencedComponent
-                bom.append(node)
-
-        # Display the BOM
-        return bom
+            return [], [], {}
+
+        root = design.rootComponent
+
+        node_list = []
+        add_node = on_node or node_list.append
+
+        root_node = component_info(root)
+        add_node(root_node)
+
+        # Gather information about each unique component - keyed by component id
+        bom = {}
+        for node in iter_assembly_nodes(root.occurrences, root_node['id'], max_depth, bom, levels, on_row):
+            add_node(node)
+
+        counts = {comp_id: row['instances'] for comp_id, row in bom.items()}
+        return list(bom.values()), node_list, counts
     except Exception as _e:
         config.app_tracking.capture_exception(_e)
         raise _e
 
 
+def extract_bom(levels=False):
+    """ returns bom
+
+    levels - also count instances per assembly level ('levels', totals) and per parent component
+    ('parents', the quantity in one instance of the parent)
+    """
+    bom, _, _ = traverse_design(levels)
+    return bom
+
+
 def component_info(comp, parent='#', comp_set=False):
     """ returns a node element """
     node = {
@@ -329,35 +703,119 @@ def component_info(comp, parent='#', comp_set=False):
     return node
 
 
-def make_component_tree():
-    """ generates the full tree """
-    ao = apper.AppObjects()
-    root = ao.root_comp
+def palette_row(row):
+    """ returns the compact palette representation of a bom row """
+    return [row.get(field) for field in config.PALETTE_FIELDS]
+
+
+def palette_changes(bom):
+    """ returns the palette rows that changed since they were last sent and the ids of removed rows """
+    state = {}
+    changed = []
+    for row in bom:
+        values = palette_row(row)
+        state[row['id']] = values
+        if config.PALETTE_STATE.get(row['id']) != values:
+            changed.append(values)
+
+    removed = [comp_id for comp_id in config.PALETTE_STATE if comp_id not in state]
+    config.PALETTE_STATE = state
+    return changed, removed
+
+
+def tree_node(row, parent, group=False):
+    """ returns a tree node element based on a bom row """
+    return {
+        'name': row['name'],
+        'nbr': row['nbr'],
+        'id': row['id'],
+        'revision-id': row['revision-id'],
+        'instances': 1,
+        'parent': parent,
+        'state': {'opened': True, 'checkbox_disabled': False},
+        'type': "4-component_group" if group else "4-component",
+        'text': row['name'],
+    }
+
+
+def walk_occurrences(occurrences: adsk.fusion.OccurrenceList, parent, max_depth=None):
+    """ yields (occurrence, component, component-id, parent-id, level, has-children) depth-first
+
+    uses an explicit stack instead of recursion so deep assemblies can not hit the recursion limit
+    max_depth - do not descend into occurrences below this level
+    """
+    stack = [(iter(occurrences), parent, 1)]
+    while stack:
+        occs, parent, level = stack[-1]
+        occurrence = next(occs, None)
+        if occurrence is None:
+            stack.pop()
+            continue
 
-    node_list = []
+        comp = occurrence.component
+        comp_id = comp.id
+        children = occurrence.childOccurrences
+        group = children.count > 0
 
-    root_node = component_info(root)
-    root_node["type"] = "4-root_component"
-    node_list.append(root_node)
+        yield occurrence, comp, comp_id, parent, level, group
 
-    if root.occurrences.count > 0:
-        make_assembly_nodes(root.occurrences, node_list, root.id)
+        if group and (max_depth is None or level < max_depth):
+            stack.append((iter(children), comp_id, level + 1))
 
-    return node_list
 
+def iter_assembly_nodes(occurrences: adsk.fusion.OccurrenceList, parent, max_depth=None, bom=None, levels=False,
+                        on_row=None):
+    """ yields the tree nodes for occurrences lazily - callers can stream them in chunks or stop early
 
-def make_assembly_nodes(occurrences: adsk.fusion.OccurrenceList, node_list, parent):
-    """ adds one node and checks for others """
-    for occurrence in occurrences:
+    bom - dict component-id -> row, collects the flat bom in the same pass
+    levels - also count instances per assembly level ('levels', totals) and per parent component
+    ('parents', the quantity in one instance of the parent)
+    on_row - called with each bom row when its component is first found
+    """
+    bom = {} if bom is None else bom
 
-        node = component_info(occurrence.component, parent)
-        if occurrence.childOccurrences.count > 0:
+    # Per parent only the children of its first expanded instance are counted
+    # counted - for each level of the current path, whether the children of that instance are counted
+    expanded = set()
+    counted = []
 
-            node["type"] = "4-component_group"
-            node_list.append(node)
-            make_assembly_nodes(occurrence.childOccurrences, node_list, occurrence.component.id)
+    for occ, comp, comp_id, parent_id, level, group in walk_occurrences(occurrences, parent, max_depth):
+        row = bom.get(comp_id)
 
+        if row:
+            # Increment the instance count of the existing row.
+            row['instances'] += 1
         else:
-            node["type"] = "4-component"
-            node_list.append(node)
+            # Gather any BOM worthy values from the component
+            volume = 0
+            bodies = comp.bRepBodies
+            for bodyK in bodies:
+                if bodyK.isSolid:
+                    volume += bodyK.volume
+
+            # Add this component to the BOM
+            row = component_info(comp, comp_set=True)
+            row['volume'] = volume
+            row['linked'] = occ.isReferencedComponent
+            if levels:
+                row['levels'] = {}
+                row['parents'] = {}
+            bom[comp_id] = row
+            if on_row:
+                on_row(row)
+
+        if levels:
+            row['levels'][level] = row['levels'].get(level, 0) + 1
+
+            del counted[level - 1:]
+            if level == 1 or counted[-1]:
+                row['parents'][parent_id] = row['parents'].get(parent_id, 0) + 1
+
+            expand = group and comp_id not in expanded and (max_depth is None or level < max_depth)
+            if expand:
+                expanded.add(comp_id)
+            counted.append(expand)
+
+        # Tree nodes reuse the row instead of asking Fusion again
+        yield tree_node(row, parent_id, group)
 # endregion
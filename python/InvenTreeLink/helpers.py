@@ -1,6 +1,7 @@
 
 import unicodedata
 import re
+import json
 import traceback
 
 from .apper import apper
@@ -44,3 +45,44 @@ def error(typ_str=None):
 def get_cmd(ao, key):
     ref_name = f'{config.company_name}_{config.app_name}_{key}'
     return ao.ui.commandDefinitions.itemById(ref_name)
+
+
+def send_progress(palette, value, message=''):
+    """ shows the progress of a background job in the palette """
+    palette.sendInfoToHTML('Progress', json.dumps({'value': value, 'message': message}))
+
+
+class PaletteStream:
+    """ sends items to the palette in batches
+
+    the palette receives <name>Begin, any number of <name>Append with a json-list of items and <name>End
+    """
+
+    def __init__(self, palette, name, chunk_size=config.PALETTE_CHUNK_SIZE):
+        self.palette = palette
+        self.name = name
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._batch = []
+
+    def begin(self, data=None):
+        self.palette.sendInfoToHTML(self.name + 'Begin', json.dumps(data or {}))
+
+    def append(self, item):
+        self._batch.append(item)
+        if len(self._batch) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def flush(self):
+        if self._batch:
+            self.palette.sendInfoToHTML(self.name + 'Append', json.dumps(self._batch))
+            self.count += len(self._batch)
+            self._batch = []
+
+    def end(self, data=None):
+        self.flush()
+        self.palette.sendInfoToHTML(self.name + 'End', json.dumps(data or {}))
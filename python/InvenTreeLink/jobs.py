@@ -0,0 +1,170 @@
+import adsk.core
+
+import collections
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from . import config
+
+
+class JobCancelled(Exception):
+    """ raised inside a job that was cancelled """
+
+
+class Job:
+    """ a unit of work running on the job executor
+
+    the job function is called with the job as first argument - it can report progress
+    and should call check() between steps so it can be cancelled
+    """
+
+    def __init__(self, executor, fn, args, kwargs, on_done=None, on_error=None, on_progress=None):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self._executor = executor
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        """ raises JobCancelled if the job was cancelled """
+        if self.cancelled:
+            raise JobCancelled(self.id)
+
+    def progress(self, value, message=''):
+        """ reports progress (0..1) back to the UI thread """
+        self.check()
+        if self.on_progress:
+            self._executor.post(self, self.on_progress, value, message)
+
+
+class JobExecutor:
+    """ runs network work off the UI thread
+
+    results, errors and progress are queued and handed back to the UI thread by a Fusion custom event,
+    so callbacks may safely use the Fusion API and the palette
+    """
+
+    def __init__(self, event_id, max_workers=4):
+        self.event_id = event_id
+        self.max_workers = max_workers
+        self._pool = None
+        self._event = None
+        self._handler = None
+        self._jobs = {}
+        self._futures = set()
+        self._queue = collections.deque()
+        self._lock = threading.Lock()
+
+    def start(self):
+        app = adsk.core.Application.get()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=config.app_name)
+        self._event = app.registerCustomEvent(self.event_id)
+        self._handler = _JobEventHandler(self)
+        self._event.add(self._handler)
+
+    def stop(self, timeout=10):
+        """ cancels all jobs and waits up to timeout seconds for the running ones to return
+
+        jobs still running after the timeout are left behind - a job blocked in a request ends with its timeout
+        """
+        self.cancel_all()
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            with self._lock:
+                futures = list(self._futures)
+            wait(futures, timeout)
+        if self._event:
+            self._event.remove(self._handler)
+            adsk.core.Application.get().unregisterCustomEvent(self.event_id)
+            self._event = None
+            self._handler = None
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+        """ runs fn(job, *args, **kwargs) on a worker thread - callbacks are called on the UI thread """
+        job = Job(self, fn, args, kwargs, on_done, on_error, on_progress)
+        with self._lock:
+            self._jobs[job.id] = job
+        future = self._pool.submit(self._run, job)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+        return job
+
+    def _discard(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def cancel_all(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+
+    def post(self, job, callback, *args):
+        """ queues a callback for the UI thread """
+        if not self._event:
+            return
+        self._queue.append((job, callback, args))
+        adsk.core.Application.get().fireCustomEvent(self.event_id, job.id)
+
+    def _run(self, job):
+        try:
+            job.check()
+            result = job.fn(job, *job.args, **job.kwargs)
+            job.check()
+            callback, args = job.on_done, (result, )
+        except JobCancelled:
+            callback, args = None, ()
+        except Exception as _e:
+            config.app_tracking.capture_exception(_e)
+            callback, args = job.on_error or _show_error, (_e, )
+        finally:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+
+        if callback:
+            self.post(job, callback, *args)
+
+    def dispatch(self):
+        """ runs all queued callbacks - called on the UI thread """
+        while self._queue:
+            job, callback, args = self._queue.popleft()
+            if job.cancelled:
+                continue
+            try:
+                callback(*args)
+            except Exception as _e:
+                config.app_tracking.capture_exception(_e)
+                _show_error(_e)
+
+
+class _JobEventHandler(adsk.core.CustomEventHandler):
+    def __init__(self, executor):
+        super().__init__()
+        self.executor = executor
+
+    def notify(self, args):
+        self.executor.dispatch()
+
+
+def _show_error(exception):
+    ui = adsk.core.Application.get().userInterface
+    message = ''.join(traceback.format_exception(type(exception), exception, exception.__traceback__))
+    if ui:
+        ui.messageBox('Failed:\n{}'.format(message))
+    else:
+        print(message)
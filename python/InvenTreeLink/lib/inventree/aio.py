@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+The aio module provides an asyncio counterpart of the InvenTreeAPI class
+and the CRUD methods of InventreeObject.
+
+Requests are sent over the pooled session of a blocking InvenTreeAPI
+on a thread pool, the number of requests in flight is bounded.
+"""
+
+
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from inventree.api import InvenTreeAPI
+from inventree.base import InventreeObject
+
+
+class AsyncInvenTreeAPI(object):
+    """
+    Class for performing Inventree API requests from asyncio code.
+    """
+
+    def __init__(self, api, max_concurrency=8):
+        """ Wrap a connected InvenTreeAPI
+
+        Args:
+            api - Connected InvenTreeAPI object
+            max_concurrency - Max. number of requests in flight (default = 8)
+        """
+
+        self.api = api
+        self.max_concurrency = max_concurrency
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='inventree')
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @classmethod
+    async def connect(cls, base_url, max_concurrency=8, **kwargs):
+        """ Connect to the server without blocking the event loop
+
+        Accepts the same kwargs as InvenTreeAPI. The connection pool is
+        sized to hold one connection per request in flight.
+        """
+
+        kwargs.setdefault('pool_maxsize', max_concurrency)
+
+        loop = asyncio.get_event_loop()
+        api = await loop.run_in_executor(None, functools.partial(InvenTreeAPI, base_url, **kwargs))
+
+        return cls(api, max_concurrency=max_concurrency)
+
+    def semaphore(self):
+        """ Return the semaphore bounding the requests in flight for the running loop
+
+        Several loops (e.g. one per thread) may share this object, the
+        shared thread pool still bounds the total number of requests.
+        """
+
+        loop = asyncio.get_event_loop()
+
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+
+        return self._semaphores[loop]
+
+    async def run(self, fn, *args, **kwargs):
+        """ Run a blocking call on the thread pool, respecting the concurrency bound """
+
+        async with self.semaphore():
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def close(self, close_api=True):
+        """ Close the thread pool and (optionally) the underlying connection """
+
+        self._executor.shutdown(wait=True)
+
+        if close_api:
+            self.api.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    # Request methods
+
+    async def request(self, url, **kwargs):
+        return await self.run(self.api.request, url, **kwargs)
+
+    async def get(self, url, **kwargs):
+        return await self.run(self.api.get, url, **kwargs)
+
+    async def post(self, url, data, files=None, **kwargs):
+        return await self.run(self.api.post, url, data, files=files, **kwargs)
+
+    async def patch(self, url, data, files=None, **kwargs):
+        return await self.run(self.api.patch, url, data, files=files, **kwargs)
+
+    async def put(self, url, data, files=None, **kwargs):
+        return await self.run(self.api.put, url, data, files=files, **kwargs)
+
+    async def delete(self, target, **kwargs):
+        """ Perform a DELETE request
+
+        Args:
+            target - API url, or an InventreeObject to delete from the database
+        """
+
+        if isinstance(target, InventreeObject):
+            return await self.run(target.delete)
+
+        return await self.run(self.api.delete, target, **kwargs)
+
+    async def downloadFile(self, url, destination):
+        return await self.run(self.api.downloadFile, url, destination)
+
+    # InventreeObject methods
+
+    async def list(self, cls, **kwargs):
+        """ Return a list of all items of the model class cls """
+        return await self.run(cls.list, self.api, **kwargs)
+
+    async def create(self, cls, data, **kwargs):
+        """ Create a new database object of the model class cls """
+        return await self.run(cls.create, self.api, data, **kwargs)
+
+    async def save(self, obj, data=None, files=None, method='PATCH'):
+        """ Save an object to the database """
+        return await self.run(obj.save, data=data, files=files, method=method)
+
+    async def reload(self, obj, fields=None):
+        """ Reload object data from the database """
+        await self.run(obj.reload, fields=fields)
+        return obj
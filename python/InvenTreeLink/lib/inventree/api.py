@@ -7,10 +7,20 @@ with the InvenTree database server.
 
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.request import ACCEPT_ENCODING
+import codecs
 import os
 import json
 import logging
+import re
+import threading
+import time
+import weakref
+
+from inventree.metrics import TransferStats
+from inventree.retry import CircuitOpenError, RetryPolicy
 
 
 logger = logging.getLogger('inventree')
@@ -44,6 +54,17 @@ class InvenTreeAPI(object):
             token - Authentication token (if provided, username/password are ignored)
             use_token_auth - Use token authentication? (default = True)
             verbose - Print extra debug messages (default = False)
+            pool_connections - Number of per-host connection pools to keep (default = 4)
+            pool_maxsize - Max. number of kept-alive connections per host (default = 10)
+            pool_block - Block when all connections of a host are in use (default = False)
+            max_retries - Retries for failed connections / idempotent requests (default = 0)
+            retry_policy - RetryPolicy deciding about retries (default = RetryPolicy(max_retries))
+            circuit_breaker - CircuitBreaker failing fast while the server is down (default = None)
+            timeout - Seconds to wait for the server to connect / send data (default = None - no limit)
+            compress - Accept compressed responses - False asks for uncompressed ones (default = True)
+            throttle - Throttle limiting the request rate / requests in flight (default = None)
+            cache - ResponseCache for revalidating GET requests (default = None)
+            identity_map - IdentityMap returning known instances of database objects (default = None)
         """
 
         # Strip out trailing "/api/" (if provided)
@@ -65,6 +86,28 @@ class InvenTreeAPI(object):
         self.use_token_auth = kwargs.get('use_token_auth', True)
         self.verbose = kwargs.get('verbose', False)
 
+        # Long-lived session - connections are kept alive and shared by all requests
+        self.session = self.createSession(
+            pool_connections=kwargs.get('pool_connections', 4),
+            pool_maxsize=kwargs.get('pool_maxsize', 10),
+            pool_block=kwargs.get('pool_block', False),
+            compress=kwargs.get('compress', True),
+        )
+
+        # Failed requests are retried in _send, for every request path
+        self.retry_policy = kwargs.get('retry_policy', None) or RetryPolicy(max_retries=kwargs.get('max_retries', 0))
+        self.circuit_breaker = kwargs.get('circuit_breaker', None)
+        self.timeout = kwargs.get('timeout', None)
+
+        # Client-side rate limit, every attempt is counted
+        self.throttle = kwargs.get('throttle', None)
+
+        # Bytes received per endpoint
+        self.transfer = TransferStats(self.api_url)
+
+        self.cache = kwargs.get('cache', None)
+        self.identity_map = kwargs.get('identity_map', None)
+
         # Check if the server is there
         if not self.testServer():
             raise ConnectionRefusedError("Could not connect to InvenTree server")
@@ -76,6 +119,175 @@ class InvenTreeAPI(object):
             if not self.token:
                 self.requestToken()
 
+    @staticmethod
+    def createSession(pool_connections=4, pool_maxsize=10, pool_block=False, compress=True):
+        """
+        Create a requests session with a keep-alive connection pool
+
+        Args:
+            pool_connections - Number of per-host connection pools to keep
+            pool_maxsize - Max. number of kept-alive connections per host
+            pool_block - Block when all connections of a host are in use
+            compress - Accept compressed responses (gzip / deflate, br only if brotli is installed)
+
+        The adapter does not retry, retries are handled by the RetryPolicy of the api.
+        """
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        # requests already sends 'gzip, deflate' - urllib3 adds 'br' only if brotli is installed (not vendored)
+        session.headers['Accept-Encoding'] = ACCEPT_ENCODING if compress else 'identity'
+
+        return session
+
+    def close(self):
+        """ Close the session and all pooled connections """
+
+        if self.session is not None:
+            logger.info("Closing connections to server: " + str(self.base_url))
+            self.session.close()
+            self.session = None
+
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _send(self, method, url, **kwargs):
+        """ Send a request through the pooled session
+
+        Failed requests are retried according to the retry policy, while the
+        circuit breaker is open CircuitOpenError is raised without sending.
+        """
+
+        if self.timeout is not None:
+            kwargs.setdefault('timeout', self.timeout)
+
+        attempt = 0
+
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before()
+
+            try:
+                response = self._sendOnce(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.failure()
+
+                if not self.retry_policy.should_retry(method, attempt, error=e, files=kwargs.get('files')):
+                    raise
+
+                delay = self.retry_policy.delay(attempt)
+
+                logger.warning("{method} '{url}' failed ({e}) - retrying in {d:.1f}s".format(
+                    method=method, url=url, e=type(e).__name__, d=delay
+                ))
+            except requests.exceptions.RequestException:
+                # Broken transfers (e.g. ChunkedEncodingError, ContentDecodingError) count as failures
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.failure()
+                raise
+            except BaseException:
+                # Errors of this client must not use up the probe of a half-open circuit
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.abort()
+                raise
+            else:
+                if self.circuit_breaker is not None:
+                    if response.status_code >= 500:
+                        self.circuit_breaker.failure()
+                    else:
+                        self.circuit_breaker.success()
+
+                if not self.retry_policy.should_retry(method, attempt, response=response, files=kwargs.get('files')):
+                    return response
+
+                delay = self.retry_policy.delay(attempt, response)
+
+                logger.warning("{method} '{url}' returned {code} - retrying in {d:.1f}s".format(
+                    method=method, url=url, code=response.status_code, d=delay
+                ))
+
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _sendOnce(self, method, url, **kwargs):
+        """ Send a single request - waiting for the throttle, if there is one """
+
+        if self.session is None:
+            raise requests.exceptions.ConnectionError("InvenTreeAPI session has been closed")
+
+        if self.throttle is None:
+            response = self._sendCached(method, url, **kwargs)
+        elif kwargs.get('stream'):
+            response = self._sendStreamed(method, url, **kwargs)
+        else:
+            with self.throttle:
+                response = self._sendCached(method, url, **kwargs)
+
+        # Streamed bodies are recorded when they were read
+        if not kwargs.get('stream'):
+            self.transfer.record_response(response)
+
+        return response
+
+    def _sendStreamed(self, method, url, **kwargs):
+        """ Send a streamed request - the throttle slot is held until the body was read or the response closed """
+
+        self.throttle.acquire()
+
+        try:
+            response = self._sendCached(method, url, **kwargs)
+        except BaseException:
+            self.throttle.release()
+            raise
+
+        released = threading.Lock()
+
+        def release():
+            if released.acquire(blocking=False):
+                self.throttle.release()
+
+        # urllib3 releases the connection when the body was read completely or the response is closed
+        raw = response.raw
+        release_conn = raw.release_conn
+
+        def release_conn_and_slot():
+            try:
+                release_conn()
+            finally:
+                release()
+
+        raw.release_conn = release_conn_and_slot
+
+        # Responses that are dropped without being read or closed
+        weakref.finalize(response, release)
+
+        return response
+
+    def _sendCached(self, method, url, **kwargs):
+        """ Send a request through the response cache, if there is one """
+
+        if self.cache is not None:
+            return self.cache.send(self.session.request, method, url, **kwargs)
+
+        return self.session.request(method, url, **kwargs)
+
     def clean_url(self, url):
 
         url = os.path.join(self.api_url, url)
@@ -97,8 +309,8 @@ class InvenTreeAPI(object):
         logger.info("Checking InvenTree server connection...")
 
         try:
-            response = requests.get(self.api_url)
-        except requests.exceptions.ConnectionError:
+            response = self._send('GET', self.api_url)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             logger.error("Server connection refused - check server address")
             return False
 
@@ -111,9 +323,9 @@ class InvenTreeAPI(object):
             return False
 
         # Record server details
-        self.server_details = json.loads(response.text)
+        self.server_details = decode_json(response)
 
-        logger.info("InvenTree server details: " + str(response.text))
+        logger.info("InvenTree server details: " + str(self.server_details))
 
         # The details provided by the server should include some specific data:
         server_name = str(self.server_details.get('server', ''))
@@ -146,9 +358,9 @@ class InvenTreeAPI(object):
         # Request an auth token from the server
         token_url = os.path.join(self.api_url, 'user/token/')
         
-        reply = requests.get(token_url, auth=self.auth)
+        reply = self._send('GET', token_url, auth=self.auth)
 
-        data = json.loads(reply.text)
+        data = decode_json(reply)
 
         if not reply.status_code == 200:
             logger.error("Error requesting token: {code} - {detail}".format(
@@ -163,7 +375,7 @@ class InvenTreeAPI(object):
             ))
             return None
 
-        self.token = json.loads(reply.text)['token']
+        self.token = data['token']
 
         logger.info("Authentication token: " + self.token)
 
@@ -191,21 +403,16 @@ class InvenTreeAPI(object):
 
         headers = kwargs.get('headers', {})
 
+        stream = kwargs.get('stream', False)
+
         search_term = kwargs.get('search', None)
 
         if search_term is not None:
             params['search'] = search_term
 
-        methods = {
-            'GET': requests.get,
-            'POST': requests.post,
-            'PUT': requests.put,
-            'PATCH': requests.patch,
-            'DELETE': requests.delete,
-            'OPTIONS': requests.options,
-        }
+        methods = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS']
 
-        if method.upper() not in methods.keys():
+        if method.upper() not in methods:
             logger.error("Unknown request method '{m}'".format(m=method))
             return None
 
@@ -226,19 +433,29 @@ class InvenTreeAPI(object):
         logger.debug(" - files:", files)
 
         try:
-            response = methods[method](
+            response = self._send(
+                method,
                 api_url,
                 auth=auth,
                 params=params,
                 headers=headers,
                 json=json,
-                files=files
+                files=files,
+                stream=stream,
             )
 
+        except CircuitOpenError as e:
+            logger.error("{e} - '{url}'".format(e=e, url=api_url))
+            return None
+
         except requests.exceptions.ConnectionError:
             logger.error("Connection refused - '{url}'".format(url=api_url))
             return None
 
+        except requests.exceptions.Timeout:
+            logger.error("Request timed out - '{url}'".format(url=api_url))
+            return None
+
         if response is None:
             logger.error("Null response - {method} '{url}'".format(method=method, url=api_url))
             return None
@@ -261,6 +478,7 @@ class InvenTreeAPI(object):
 
         if not ctype == 'application/json':
             logger.error("'Response content-type is not JSON - '{url}' - '{f}'".format(url=api_url, f=ctype))
+            response.close()
             return None
 
         return response
@@ -303,7 +521,17 @@ class InvenTreeAPI(object):
         else:
             auth = self.auth
 
-        response = requests.post(url, data=data, headers=headers, auth=auth, files=files, **kwargs)
+        try:
+            response = self._send('POST', url, data=data, headers=headers, auth=auth, files=files, **kwargs)
+        except CircuitOpenError as e:
+            logger.error("{e} - '{url}'".format(e=e, url=url))
+            return None
+        except requests.exceptions.ConnectionError:
+            logger.error("Connection refused - '{url}'".format(url=url))
+            return None
+        except requests.exceptions.Timeout:
+            logger.error("Request timed out - '{url}'".format(url=url))
+            return None
 
         if response is None:
             return None
@@ -314,7 +542,7 @@ class InvenTreeAPI(object):
             return None
         
         try:
-            data = json.loads(response.text)
+            data = decode_json(response)
         except json.decoder.JSONDecodeError:
             logger.error("Error decoding JSON response - '{url}'".format(url=url))
             return None
@@ -356,7 +584,7 @@ class InvenTreeAPI(object):
             return None
 
         try:
-            data = json.loads(response.text)
+            data = decode_json(response)
         except json.decoder.JSONDecodeError:
             logger.error(f"Error decoding JSON response - '{url}'")
             return None
@@ -396,23 +624,29 @@ class InvenTreeAPI(object):
             return None
 
         try:
-            data = json.loads(response.text)
+            data = decode_json(response)
         except json.decoder.JSONDecodeError:
             logger.error(f"Error decoding JSON response - '{url}'")
             return None
 
         return data
 
-    def get(self, url, **kwargs):
+    def get(self, url, fields=None, **kwargs):
         """ Perform a GET request
 
         Args:
             url - API url
+            fields - Only return these fields of each object (the 'pk' field is always returned)
 
         kwargs:
 
+        The fields are requested from the server with the 'fields' query param.
+        Servers that ignore the param return all fields, which are then removed here.
         """
 
+        if fields:
+            fields = self._requestFields(fields, kwargs)
+
         response = self.request(url, method='get', **kwargs)
 
         # No response returned
@@ -420,13 +654,72 @@ class InvenTreeAPI(object):
             return None
 
         try:
-            data = json.loads(response.text)
+            data = decode_json(response)
         except json.decoder.JSONDecodeError:
             logger.error("Error decoding JSON response - '{url}'".format(url=url))
             return None
 
+        if fields:
+            data = project(data, fields)
+
         return data
 
+    def stream(self, url, fields=None, chunk_size=64 * 1024, **kwargs):
+        """ Perform a GET request and yield the rows of a list response while it is received
+
+        Args:
+            url - API url
+            fields - Only return these fields of each row (see get)
+            chunk_size - Number of bytes read from the connection at once
+
+        Only one row is decoded at a time, the response body is never held in
+        memory completely. Paginated responses are decoded as a whole.
+        Raises requests.exceptions.RequestException if the request fails and
+        ValueError if the response is not a valid JSON list.
+        """
+
+        if fields:
+            fields = self._requestFields(fields, kwargs)
+
+        response = self.request(url, method='get', stream=True, **kwargs)
+
+        if response is None:
+            raise requests.exceptions.RequestException("GET request failed - '{url}'".format(url=url))
+
+        decoded_bytes = 0
+
+        def chunks():
+            nonlocal decoded_bytes
+
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                decoded_bytes += len(chunk)
+                yield chunk
+
+        with response:
+            if response.status_code >= 300:
+                raise requests.exceptions.HTTPError(
+                    "Bad response ({code}) - '{url}'".format(code=response.status_code, url=url),
+                    response=response,
+                )
+
+            try:
+                for data in iter_json_array(chunks()):
+                    yield project(data, fields) if fields else data
+            finally:
+                self.transfer.record_response(response, decoded_bytes)
+
+    @staticmethod
+    def _requestFields(fields, kwargs):
+        """ Add the 'fields' query param to the request kwargs, returns the set of fields """
+
+        fields = set(fields) | {'pk'}
+
+        params = dict(kwargs.get('params') or {})
+        params['fields'] = ','.join(sorted(fields))
+        kwargs['params'] = params
+
+        return fields
+
     def downloadFile(self, url, destination):
         """
         Download a file from the InvenTree server.
@@ -460,7 +753,7 @@ class InvenTreeAPI(object):
             headers = {}
             auth = self.auth
 
-        with requests.get(url, stream=True, auth=auth, headers=headers) as request:
+        with self._send('GET', url, stream=True, auth=auth, headers=headers) as request:
 
             if not request.status_code == 200:
                 logger.error(
@@ -478,10 +771,176 @@ class InvenTreeAPI(object):
 
                 return False
 
+            decoded_bytes = 0
+
             with open(destination, 'wb') as f:
 
                 for chunk in request.iter_content(chunk_size=16 * 1024):
                     f.write(chunk)
+                    decoded_bytes += len(chunk)
+
+            self.transfer.record_response(request, decoded_bytes)
 
         logger.info(f"Downloaded '{url}' to '{destination}'")
         return True
+
+
+def project(data, fields):
+    """ Remove all but the given fields from the object(s) in a decoded response
+
+    Handles single objects, lists of objects and paginated responses.
+    """
+
+    if isinstance(data, list):
+        return [project(item, fields) for item in data]
+
+    if isinstance(data, dict):
+        if 'results' in data and isinstance(data['results'], list):
+            return dict(data, results=project(data['results'], fields))
+
+        if data.keys() <= fields:
+            return data
+
+        return {key: value for key, value in data.items() if key in fields}
+
+    return data
+
+
+def decode_json(response):
+    """ Decode the JSON body of a response
+
+    The body is decoded from bytes as UTF-8 (RFC 8259) - unlike response.text this
+    never runs the charset detection for responses without a charset.
+    Raises json.decoder.JSONDecodeError like json.loads.
+    """
+
+    content = response.content
+
+    try:
+        return json.loads(content)
+    except UnicodeDecodeError:
+        # Invalid UTF-8 - replace the bad bytes like response.text does
+        return json.loads(content.decode('utf-8', errors='replace'))
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def iter_json_array(chunks):
+    """ Yield the items of a JSON array, decoded incrementally from byte chunks
+
+    If the document is a paginated response, the items of 'results' are yielded.
+    """
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+
+    # Rows are decoded one by one - share the key strings between all rows like json.loads does
+    keys = {}
+
+    def make_dict(pairs):
+        return {keys.setdefault(key, key): value for key, value in pairs}
+
+    scanner = json.JSONDecoder(object_pairs_hook=make_dict)
+    chunks = iter(chunks)
+
+    buffer = ''
+    pos = 0
+    complete = False
+
+    def read():
+        """ Append the next chunk to the unparsed part of the buffer - returns False at the end """
+        nonlocal buffer, pos, complete
+
+        chunk = next(chunks, None)
+
+        if chunk is None:
+            complete = True
+            buffer = buffer[pos:] + decoder.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + decoder.decode(chunk)
+
+        pos = 0
+
+        return not complete
+
+    # Find the start of the document
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+
+        if pos < len(buffer):
+            break
+
+        if not read():
+            raise ValueError("Empty JSON document")
+
+    if buffer[pos] != '[':
+        # Not a plain list - decode the whole document
+        while read():
+            pass
+
+        data = json.loads(buffer)
+
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            yield from data['results']
+            return
+
+        raise ValueError("JSON document is not a list")
+
+    pos += 1
+
+    # Like json.loads: items are separated by exactly one comma, no trailing comma
+    expect_item = True
+    empty = True
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+
+        if pos >= len(buffer):
+            if not read():
+                raise json.decoder.JSONDecodeError("Unterminated JSON list", buffer, pos)
+            continue
+
+        char = buffer[pos]
+
+        if char == ']' and (not expect_item or empty):
+            # Only whitespace may follow the list
+            pos += 1
+
+            while True:
+                pos = _WHITESPACE.match(buffer, pos).end()
+
+                if pos < len(buffer):
+                    raise json.decoder.JSONDecodeError("Extra data", buffer, pos)
+
+                if not read():
+                    return
+
+        if not expect_item:
+            if char != ',':
+                raise json.decoder.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+
+            pos += 1
+            expect_item = True
+            continue
+
+        if char in ',]':
+            raise json.decoder.JSONDecodeError("Expecting value", buffer, pos)
+
+        try:
+            item, end = scanner.raw_decode(buffer, pos)
+        except json.decoder.JSONDecodeError:
+            # The item is not complete yet
+            if not read():
+                raise
+            continue
+
+        # A number is only complete when it is followed by a delimiter - it may continue in the next chunk
+        if not complete and type(item) in (int, float) and (end == len(buffer) or buffer[end] not in ' \t\n\r,]'):
+            read()
+            continue
+
+        pos = end
+        expect_item = False
+        empty = False
+
+        yield item
@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 
 import os
+import collections
+import copy
 import logging
 import json
+import operator
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from inventree.api import decode_json
 
 
 INVENTREE_PYTHON_VERSION = "0.4.4"
@@ -24,27 +31,73 @@ class InventreeObject(object):
 
         return f"{type(self)}<pk={self.pk}>"
 
-    def __init__(self, api, pk=None, data={}):
+    def __new__(cls, api=None, pk=None, data=None, lazy=False, partial=False):
+        """ Return the known instance if the api has an identity map """
+
+        instance = super().__new__(cls)
+
+        # Serializes loading, so concurrent users of one instance fetch it once
+        instance._load_lock = threading.RLock()
+
+        identity_map = getattr(api, 'identity_map', None)
+
+        if identity_map is not None:
+            # The new instance is registered before it is loaded - concurrent constructors share it
+            return identity_map.setdefault(instance, (data or {}).get('pk', None) if pk is None else pk)
+
+        return instance
+
+    def __init__(self, api, pk=None, data=None, lazy=False, partial=False):
         """ Instantiate this InvenTree object.
 
         Args:
             pk - The ID (primary key) associated with this object on the server
             api - The request manager object
             data - JSON representation of the object
+            lazy - Do not fetch the data before the first field is accessed (default = False)
+            partial - data only holds some fields, the others are fetched on first access (default = False)
         """
 
-        # If the pk is not explicitly provided,
-        # extract it from the provided dataset
-        if pk is None:
-            pk = data.get('pk', None)
+        # Own copy - reload(fields=...) updates the data in place
+        data = dict(data or {})
 
-        self._url = "{url}/{pk}/".format(url=self.URL, pk=pk)
-        self._api = api
-        self._data = data
+        with self._load_lock:
+            # Instance returned from the identity map - only take over newer data
+            if '_data' in self.__dict__ and (data or self.pk is not None):
+                if data:
+                    self._data = dict(self._data, **data)
 
-        # If the data are not populated, fetch from server
-        if len(self._data) == 0:
-            self.reload()
+                    if not partial:
+                        self._lazy = False
+                return
+
+            # If the pk is not explicitly provided,
+            # extract it from the provided dataset
+            if pk is None:
+                pk = data.get('pk', None)
+
+            self._url = "{url}/{pk}/".format(url=self.URL, pk=pk)
+            self._api = api
+            self._data = data
+            self._lazy = partial
+
+            # If the data are not populated, fetch from server (now or on first access)
+            if len(self._data) == 0:
+                if lazy and pk is not None:
+                    self._data = {'pk': pk}
+                    self._lazy = True
+                else:
+                    self._lazy = False
+                    self.reload()
+
+        identity_map = getattr(api, 'identity_map', None)
+
+        if identity_map is not None:
+            if self.pk is None:
+                # Loading failed - do not hand out the empty instance
+                identity_map.discard(self, pk)
+            else:
+                identity_map.add(self)
 
     @classmethod
     def fields(cls, api):
@@ -64,7 +117,7 @@ class InventreeObject(object):
             return {}
 
         try:
-            data = json.loads(response.text)
+            data = decode_json(response)
         except json.decoder.JSONDecodeError:
             logger.error(f"Error decoding JSON response for '{cls.URL}'")
             return {}
@@ -87,6 +140,79 @@ class InventreeObject(object):
         """ Convenience method for accessing primary-key field """
         return self._data.get('pk', None)
 
+    @property
+    def loaded(self):
+        """ False for lazy or partial objects whose data were not fetched completely """
+        return not self._lazy
+
+    def _load(self):
+        """ Fetch the data of a lazy or partial object """
+        if self._lazy:
+            with self._load_lock:
+                # Another thread may have loaded it meanwhile
+                if self._lazy:
+                    self.reload()
+                    # Not retried if loading failed
+                    self._lazy = False
+
+    @classmethod
+    def hydrate(cls, api, objects, fields=None, chunk_size=100):
+        """ Fetch the data of many lazy objects with filtered list requests
+
+        Args:
+            api - The request manager object
+            objects - Objects of this class, objects that are loaded already are skipped
+            fields - Only fetch these fields (see InvenTreeAPI.get)
+            chunk_size - Max. number of objects fetched per request
+
+        The objects are selected with a 'pk__in' filter. Servers that do not support
+        the filter return the whole list - it is fetched once and all objects are
+        picked from it. Returns the objects that could not be loaded.
+        """
+
+        pending = {}
+
+        for obj in objects:
+            if not obj.loaded:
+                pending.setdefault(str(obj.pk), []).append(obj)
+
+        pks = list(pending.keys())
+
+        for start in range(0, len(pks), chunk_size):
+            chunk = pks[start:start + chunk_size]
+
+            rows = api.get(cls.URL, params={'pk__in': ','.join(chunk)}, fields=fields)
+
+            if rows is None:
+                continue
+
+            # Paginated response
+            if isinstance(rows, dict):
+                rows = rows.get('results', [])
+
+            requested = set(chunk)
+            unfiltered = False
+
+            for data in rows:
+                pk = str(data.get('pk'))
+
+                if pk not in requested:
+                    unfiltered = True
+
+                for obj in pending.pop(pk, []):
+                    if fields:
+                        obj._data.update(data)
+                    else:
+                        obj._data = data
+                        obj._lazy = False
+
+            if unfiltered:
+                # The filter was ignored - the other chunks are not in the list either
+                logger.warning(f"Server ignores the 'pk__in' filter - '{cls.URL}'")
+                break
+
+        return [obj for group in pending.values() for obj in group]
+
     @classmethod
     def create(cls, api, data, **kwargs):
         """ Create a new database object in this class. """
@@ -104,14 +230,31 @@ class InventreeObject(object):
         return cls(api, data=response)
 
     @classmethod
-    def list(cls, api, **kwargs):
+    def list(cls, api, *, fields=None, page_size=None, lazy=False, prefetch=False, compact=False, stream=False,
+             **kwargs):
         """ Return a list of all items in this class on the database.
 
         Requires:
 
         URL - Base URL
+
+        Args:
+            fields - Only fetch these fields of each item (see InvenTreeAPI.get)
+            page_size - Fetch the items in pages of this size (limit / offset)
+            lazy - Return a PagedList that fetches the pages while it is iterated
+            prefetch - Fetch the next page in the background while a page is iterated
+            compact - Return read-only records stored in a column-oriented RecordBatch
+            stream - Return an iterator that creates the items while the response is received
+                (see InvenTreeAPI.stream) - request errors are raised while it is iterated.
+                With compact the rows are collected into a RecordBatch. Not supported with lazy or page_size
+
+        Without page_size the whole list is fetched with a single request.
+        In eager mode (default) a list is returned, or None if any page failed.
         """
 
+        if stream and (lazy or page_size):
+            raise ValueError("'stream' can not be combined with 'lazy' or 'page_size'")
+
         # Dict of query params to send to the API
         params = kwargs
 
@@ -121,22 +264,69 @@ class InventreeObject(object):
         else:
             url = cls.URL
 
-        response = api.get(url=url, params=params, **kwargs)
+        if lazy or page_size:
+            pages = PagedList(
+                cls, api, url, params,
+                fields=fields,
+                page_size=page_size or PagedList.PAGE_SIZE,
+                prefetch=prefetch,
+                compact=compact,
+            )
+
+            if lazy:
+                return pages
+
+            if compact:
+                items = RecordBatch(cls, api, partial=bool(fields))
+
+                for rows in pages.pages():
+                    items.extend(rows)
+            else:
+                items = [item for item in pages]
+
+            return None if pages.failed else items
+
+        if stream:
+            rows = api.stream(url, params=params, fields=fields)
+
+            if not compact:
+                # Only the current row is held in memory
+                return (cls(data=data, api=api, partial=bool(fields)) for data in rows if 'pk' in data)
+
+            items = RecordBatch(cls, api, partial=bool(fields))
+
+            try:
+                items.extend(rows)
+            except (IOError, ValueError) as e:
+                logger.error(f"Error streaming list from '{url}' - {e}")
+                return None
+
+            return items
+
+        response = api.get(url=url, params=params, fields=fields, **kwargs)
 
         if response is None:
             return None
 
+        if compact:
+            return RecordBatch(cls, api, response, partial=bool(fields))
+
         items = []
 
         for data in response:
             if 'pk' in data:
-                items.append(cls(data=data, api=api))
+                items.append(cls(data=data, api=api, partial=bool(fields)))
 
         return items
 
     def delete(self):
         """ Delete this object from the database """
         if self._api:
+            identity_map = getattr(self._api, 'identity_map', None)
+
+            if identity_map is not None:
+                identity_map.discard(self)
+
             return self._api.delete(self._url)
 
     def save(self, data=None, files=None, method='PATCH'):
@@ -146,6 +336,7 @@ class InventreeObject(object):
         
         # If 'data' is not specified, then use *all* the data
         if data is None:
+            self._load()
             data = self._data
         
         if self._api:
@@ -167,31 +358,473 @@ class InventreeObject(object):
 
         return response
 
-    def reload(self):
-        """ Reload object data from the database """
+    def reload(self, fields=None):
+        """ Reload object data from the database
+
+        Args:
+            fields - Only reload these fields, the other fields keep their values
+        """
         if self._api:
-            data = self._api.get(self._url)
+            data = self._api.get(self._url, fields=fields)
             if data is not None:
-                self._data = data
+                if fields:
+                    self._data.update(data)
+                else:
+                    self._data = data
+                    self._lazy = False
 
     def __getattr__(self, name):
-        if name in self._data.keys():
+        # Internal attributes are never fetched
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        try:
             return self._data[name]
-        else:
-            return super().__getattr__(name)
+        except KeyError:
+            pass
+
+        self._load()
+
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
 
     def __getitem__(self, name):
+        if name not in self._data.keys():
+            self._load()
+
         if name in self._data.keys():
             return self._data[name]
         else:
             raise KeyError("Key '{k}' does not exist in dataset".format(k=name))
 
     def __setitem__(self, name, value):
+        if name not in self._data.keys():
+            self._load()
+
         if name in self._data.keys():
             self._data[name] = value
         else:
             raise KeyError("Key '{k}' does not exist in dataset".format(k=name))
 
+    def __getstate__(self):
+        # Neither the lock nor the api connection can be pickled - an unpickled object
+        # only holds the data that were loaded
+        state = self.__dict__.copy()
+        state.pop('_load_lock', None)
+        state['_api'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load_lock = threading.RLock()
+
+    def __copy__(self):
+        # Copies share the api connection, but not the lock
+        obj = type(self).__new__(type(self))
+        obj.__setstate__(self.__getstate__())
+        obj._api = self._api
+        return obj
+
+    def __deepcopy__(self, memo):
+        obj = type(self).__new__(type(self))
+        memo[id(self)] = obj
+        obj.__setstate__(copy.deepcopy(self.__getstate__(), memo))
+        obj._api = self._api
+        return obj
+
+
+class IdentityMap(object):
+    """ Bounded map (class, pk) -> instance, so every database object is loaded once per api
+
+    Pass it to InvenTreeAPI (identity_map=...) - constructing an object that is in
+    the map returns the known instance instead of loading it again. Call reload()
+    on the instance to fetch the current state from the server.
+
+    Instances listed with a fields projection are partial, the other fields are
+    fetched on first access.
+    """
+
+    def __init__(self, max_entries=1024, models=None):
+        """ Create an identity map
+
+        Args:
+            max_entries - Number of instances kept, the least recently used are dropped
+            models - Only keep instances of these classes (default = None - all classes)
+        """
+
+        self.max_entries = max_entries
+        self.models = tuple(models) if models else None
+
+        self._instances = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(cls, pk):
+        return (cls, str(pk))
+
+    def get(self, cls, pk):
+        """ Return the known instance of cls with this pk (or None) """
+
+        if pk is None or (self.models is not None and not issubclass(cls, self.models)):
+            return None
+
+        key = self.key(cls, pk)
+
+        with self._lock:
+            instance = self._instances.get(key)
+
+            if instance is not None:
+                self._instances.move_to_end(key)
+
+            return instance
+
+    def setdefault(self, instance, pk):
+        """ Return the known instance of the class of instance with this pk, or remember instance """
+
+        cls = type(instance)
+
+        if pk is None or (self.models is not None and not issubclass(cls, self.models)):
+            return instance
+
+        key = self.key(cls, pk)
+
+        with self._lock:
+            known = self._instances.setdefault(key, instance)
+            self._instances.move_to_end(key)
+
+            while len(self._instances) > self.max_entries:
+                self._instances.popitem(last=False)
+
+            return known
+
+    def add(self, instance):
+        """ Remember an instance (ignored for untracked classes) """
+
+        cls = type(instance)
+
+        if self.models is not None and not issubclass(cls, self.models):
+            return
+
+        key = self.key(cls, instance.pk)
+
+        with self._lock:
+            # Another thread may have loaded the same object - the first one is kept
+            self._instances.setdefault(key, instance)
+            self._instances.move_to_end(key)
+
+            while len(self._instances) > self.max_entries:
+                self._instances.popitem(last=False)
+
+    def discard(self, instance, pk=None):
+        """ Forget an instance (registered with pk, default = instance.pk) """
+
+        key = self.key(type(instance), instance.pk if pk is None else pk)
+
+        with self._lock:
+            if self._instances.get(key) is instance:
+                del self._instances[key]
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+
+    def __len__(self):
+        return len(self._instances)
+
+
+class PagedList(object):
+    """ Lazy list of database objects, fetched page by page while iterating
+
+    Every iteration fetches the pages again. If a page can not be fetched
+    the iteration stops and 'failed' is set.
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(self, cls, api, url, params, fields=None, page_size=PAGE_SIZE, prefetch=False, compact=False):
+        """ Prepare the list - nothing is fetched before iterating
+
+        Args:
+            cls - Model class of the items
+            api - The request manager object
+            url - API url of the list endpoint
+            params - Query params (filters) sent with every page
+            fields - Only fetch these fields of each item
+            page_size - Number of items per page
+            prefetch - Fetch the next page in the background
+            compact - Yield read-only records (see RecordBatch) instead of objects
+        """
+
+        self.cls = cls
+        self.api = api
+        self.url = url
+        self.params = params
+        self.fields = fields
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.compact = compact
+
+        # Total number of items reported by the server (known after the first page)
+        self.count = None
+        self.failed = False
+
+    def fetch(self, offset):
+        """ Fetch the page starting at offset """
+
+        params = dict(self.params, limit=self.page_size, offset=offset)
+
+        return self.api.get(url=self.url, params=params, fields=self.fields)
+
+    def __iter__(self):
+        for rows in self.pages():
+            if self.compact:
+                yield from RecordBatch(self.cls, self.api, rows, partial=bool(self.fields))
+            else:
+                for data in rows:
+                    if 'pk' in data:
+                        yield self.cls(data=data, api=self.api, partial=bool(self.fields))
+
+    def pages(self):
+        """ Yield the decoded rows of every page """
+
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        pending = None
+        offset = 0
+
+        self.failed = False
+
+        try:
+            while True:
+                page = pending.result() if pending else self.fetch(offset)
+                pending = None
+
+                if page is None:
+                    logger.error(f"Error fetching page at offset {offset} - '{self.url}'")
+                    self.failed = True
+                    return
+
+                # Servers without pagination return all items at once
+                if isinstance(page, list):
+                    results = page
+                    self.count = len(page)
+                    last = True
+                else:
+                    results = page.get('results', [])
+                    self.count = page.get('count', self.count)
+                    last = not results or not page.get('next')
+
+                offset += len(results)
+
+                if executor and not last:
+                    pending = executor.submit(self.fetch, offset)
+
+                yield results
+
+                if last:
+                    return
+
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
+
+class _Missing(object):
+    """ Marks a field that is missing in a row of a RecordBatch """
+
+    def __reduce__(self):
+        # Unpickled batches refer to the same marker
+        return '_MISSING'
+
+
+_MISSING = _Missing()
+
+
+class RecordBatch(object):
+    """ Column-oriented storage of list rows
+
+    Every field is kept in one list with a value per row, the rows are accessed
+    through Record views. This uses much less memory than one InventreeObject
+    (with its own dict) per row. Records are read-only, to_object() returns a
+    full InventreeObject. Use column() to read one field of all rows at once.
+    """
+
+    def __init__(self, cls, api, rows=(), partial=False):
+        """ Create a batch
+
+        Args:
+            cls - Model class of the rows
+            api - The request manager object
+            rows - Decoded rows (dicts), rows without a 'pk' are skipped
+            partial - The rows only hold some fields (fields projection)
+        """
+
+        self.cls = cls
+        self.api = api
+        self.partial = partial
+        self.columns = {}
+        self.length = 0
+
+        # Records of this batch get a property per column, bound to the column list
+        self._record_cls = type(Record.__name__, (Record, ), {'__slots__': ()})
+
+        self.extend(rows)
+
+    def _add_column(self, name, column):
+        """ Add a column and its record property """
+
+        self.columns[name] = column
+
+        if name.isidentifier() and not hasattr(Record, name):
+            setattr(self._record_cls, name, _column_property(name, column))
+
+    def extend(self, rows):
+        """ Append decoded rows """
+
+        columns = self.columns
+
+        for data in rows:
+            if 'pk' not in data:
+                continue
+
+            for name, value in data.items():
+                column = columns.get(name)
+
+                if column is None:
+                    column = [_MISSING] * self.length
+                    self._add_column(name, column)
+
+                column.append(value)
+
+            self.length += 1
+
+            # Fields that were not in this row
+            if len(data) < len(columns):
+                for column in columns.values():
+                    if len(column) < self.length:
+                        column.append(_MISSING)
+
+    def column(self, name):
+        """ Return all values of a field (None where the field is missing) """
+
+        column = self.columns.get(name)
+
+        if column is None:
+            return [None] * self.length
+
+        return [None if value is _MISSING else value for value in column]
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            batch = RecordBatch(self.cls, self.api, partial=self.partial)
+
+            for name, column in self.columns.items():
+                batch._add_column(name, column[index])
+
+            batch.length = len(range(*index.indices(self.length)))
+
+            return batch
+
+        if index < 0:
+            index += self.length
+
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+
+        return self._record_cls(self, index)
+
+    def __iter__(self):
+        record_cls = self._record_cls
+
+        for index in range(self.length):
+            yield record_cls(self, index)
+
+    def __getstate__(self):
+        # The record class is rebuilt when unpickled
+        state = dict(self.__dict__)
+        del state['_record_cls']
+        return state
+
+    def __setstate__(self, state):
+        columns = state.pop('columns')
+
+        self.__dict__.update(state, columns={})
+        self._record_cls = type(Record.__name__, (Record, ), {'__slots__': ()})
+
+        for name, column in columns.items():
+            self._add_column(name, column)
+
+
+def _column_property(name, column):
+    """ Return a record property reading a field straight from its column """
+
+    def get(record):
+        value = column[record._index]
+
+        if value is _MISSING:
+            raise AttributeError(name)
+
+        return value
+
+    return property(get)
+
+
+class Record(object):
+    """ Read-only view of one row of a RecordBatch
+
+    Fields are read as attributes or items, fields that clash with the
+    methods of Record (e.g. 'get') are only available as items.
+    """
+
+    __slots__ = ('_batch', '_index')
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    def __str__(self):
+        return f"{self._batch.cls}<pk={self.pk}>"
+
+    def __reduce__(self):
+        return operator.getitem, (self._batch, self._index)
+
+    @property
+    def pk(self):
+        return self.get('pk')
+
+    def _asdict(self):
+        """ Return the row as a dict """
+        index = self._index
+        return {
+            name: column[index]
+            for name, column in self._batch.columns.items()
+            if column[index] is not _MISSING
+        }
+
+    def get(self, name, default=None):
+        column = self._batch.columns.get(name)
+
+        if column is None or column[self._index] is _MISSING:
+            return default
+
+        return column[self._index]
+
+    def to_object(self):
+        """ Return an InventreeObject of the model class for this row """
+        return self._batch.cls(self._batch.api, data=self._asdict(), partial=self._batch.partial)
+
+    def __getitem__(self, name):
+        value = self.get(name, _MISSING)
+
+        if value is _MISSING:
+            raise KeyError("Key '{k}' does not exist in dataset".format(k=name))
+
+        return value
+
 
 class Attachment(InventreeObject):
     """ Class representing a file attachment object """
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""
+The cache module provides a response cache for GET requests, based on
+conditional requests (ETag / Last-Modified).
+
+Cached responses are always revalidated with the server - a '304 Not Modified'
+answer is served from the cache, so unchanged bodies are not downloaded again.
+Responses without validators or with 'Cache-Control: no-store' are not cached.
+"""
+
+
+import collections
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+logger = logging.getLogger('inventree')
+
+
+# Response headers kept with a cached body
+CACHED_HEADERS = ('content-type', 'etag', 'last-modified')
+
+
+class CacheEntry(object):
+    """ A cached response body with its validators """
+
+    __slots__ = ('status_code', 'headers', 'content')
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def validators(self):
+        """ Conditional request headers for revalidating this entry """
+
+        headers = {}
+
+        if 'etag' in self.headers:
+            headers['If-None-Match'] = self.headers['etag']
+        if 'last-modified' in self.headers:
+            headers['If-Modified-Since'] = self.headers['last-modified']
+
+        return headers
+
+    def response(self, response):
+        """ Build a full response from this entry and a '304 Not Modified' response """
+
+        cached = requests.Response()
+        cached.status_code = self.status_code
+        cached.headers = CaseInsensitiveDict(self.headers)
+        cached._content = self.content
+        cached.url = response.url
+        cached.request = response.request
+        cached.elapsed = response.elapsed
+        cached.encoding = response.encoding
+
+        return cached
+
+
+class ResponseCache(object):
+    """
+    LRU cache of GET responses, with an optional disk tier.
+    """
+
+    def __init__(self, max_entries=256, path=None, max_disk_entries=4096):
+        """ Create a cache
+
+        Args:
+            max_entries - Number of responses kept in memory
+            path - sqlite file for the disk tier (default = None - memory only)
+            max_disk_entries - Number of responses kept on disk
+        """
+
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS response_cache ('
+                    ' key TEXT PRIMARY KEY,'
+                    ' status INTEGER NOT NULL,'
+                    ' headers TEXT NOT NULL,'
+                    ' content BLOB NOT NULL,'
+                    ' used REAL NOT NULL)'
+                )
+
+    @staticmethod
+    def key(url, params=None):
+        """ Return the cache key of a GET request """
+
+        return requests.Request('GET', url, params=params).prepare().url
+
+    def get(self, key):
+        """ Return the entry for key (or None) - disk entries are moved to memory """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                'SELECT status, headers, content FROM response_cache WHERE key = ?', (key, )
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            entry = CacheEntry(row[0], json.loads(row[1]), bytes(row[2]))
+            self._remember(key, entry)
+
+            with self._db:
+                self._db.execute('UPDATE response_cache SET used = ? WHERE key = ?', (time.time(), key))
+
+            return entry
+
+    def put(self, key, response):
+        """ Store a response - returns False if the response can not be cached """
+
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+
+        cache_control = response.headers.get('cache-control', '').lower()
+
+        if 'no-store' in cache_control or not ('etag' in headers or 'last-modified' in headers):
+            self.discard(key)
+            return False
+
+        entry = CacheEntry(response.status_code, headers, response.content)
+
+        with self._lock:
+            self._remember(key, entry)
+
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)',
+                        (key, entry.status_code, json.dumps(headers), entry.content, time.time())
+                    )
+                    self._db.execute(
+                        'DELETE FROM response_cache WHERE key NOT IN '
+                        '(SELECT key FROM response_cache ORDER BY used DESC LIMIT ?)',
+                        (self.max_disk_entries, )
+                    )
+
+        return True
+
+    def discard(self, key):
+        """ Remove an entry from all tiers """
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+            if self._db is not None:
+                with self._db:
+                    self._db.execute('DELETE FROM response_cache WHERE key = ?', (key, ))
+
+    def clear(self):
+        """ Remove all entries and reset the counters """
+
+        with self._lock:
+            self._entries.clear()
+
+            if self._db is not None:
+                with self._db:
+                    self._db.execute('DELETE FROM response_cache')
+
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """ Close the disk tier """
+
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        """ Return the hit / miss counters """
+
+        total = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def _remember(self, key, entry):
+        """ Add an entry to the memory tier (lock must be held) """
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # Request handling
+
+    def send(self, send, method, url, **kwargs):
+        """ Send a request through the cache
+
+        Args:
+            send - Function that sends the request (method, url, **kwargs)
+            method - HTTP method, only GET requests are cached
+            url - Request url
+        """
+
+        if method != 'GET' or kwargs.get('stream'):
+            return send(method, url, **kwargs)
+
+        key = self.key(url, kwargs.get('params'))
+        entry = self.get(key)
+
+        if entry is not None:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **entry.validators)
+
+        response = send(method, url, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            logger.debug("Not modified - serving cached response for '{url}'".format(url=key))
+            with self._lock:
+                self.hits += 1
+            return entry.response(response)
+
+        with self._lock:
+            self.misses += 1
+
+        if response.status_code == 200:
+            self.put(key, response)
+        else:
+            self.discard(key)
+
+        return response
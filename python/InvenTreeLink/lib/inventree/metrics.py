@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+The metrics module collects transfer statistics of an InvenTreeAPI.
+"""
+
+
+import re
+import threading
+
+
+# Primary keys in urls are replaced, so all objects of an endpoint are counted together
+_PK = re.compile(r'/\d+(?=/|$)')
+
+
+class TransferStats(object):
+    """
+    Per-endpoint count of requests, bytes on the wire and decoded bytes.
+    """
+
+    def __init__(self, api_url=''):
+        """ Create empty statistics
+
+        Args:
+            api_url - Base url that is removed from the recorded urls
+        """
+
+        self.api_url = api_url
+
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def endpoint(self, method, url):
+        """ Return the endpoint name of a request, e.g. 'GET part/{pk}/' """
+
+        if url.startswith(self.api_url):
+            url = url[len(self.api_url):]
+
+        # Strip the query
+        url = url.split('?', 1)[0]
+
+        return '{method} {url}'.format(method=method, url=_PK.sub('/{pk}', '/' + url)[1:] or '/')
+
+    def record(self, method, url, wire_bytes, decoded_bytes, encoding=None):
+        """ Record a finished response
+
+        Args:
+            method - HTTP method
+            url - Request url
+            wire_bytes - Size of the body as received (compressed)
+            decoded_bytes - Size of the decoded body
+            encoding - Content-Encoding of the response
+        """
+
+        name = self.endpoint(method, url)
+
+        with self._lock:
+            stats = self._endpoints.get(name)
+
+            if stats is None:
+                stats = self._endpoints[name] = {
+                    'requests': 0,
+                    'wire_bytes': 0,
+                    'decoded_bytes': 0,
+                    'compressed': 0,
+                }
+
+            stats['requests'] += 1
+            stats['wire_bytes'] += wire_bytes
+            stats['decoded_bytes'] += decoded_bytes
+
+            if encoding and encoding != 'identity':
+                stats['compressed'] += 1
+
+    def record_response(self, response, decoded_bytes=None):
+        """ Record a response whose body was read completely
+
+        Args:
+            response - requests.Response
+            decoded_bytes - Size of the decoded body (default = len(response.content))
+        """
+
+        if decoded_bytes is None:
+            decoded_bytes = len(response.content or b'')
+
+        raw = response.raw
+
+        # Responses served from the cache have no raw connection - nothing was transferred
+        wire_bytes = raw.tell() if raw is not None and hasattr(raw, 'tell') else 0
+
+        self.record(
+            response.request.method if response.request is not None else 'GET',
+            response.url or '',
+            wire_bytes,
+            decoded_bytes,
+            response.headers.get('content-encoding'),
+        )
+
+    def stats(self):
+        """ Return a copy of the statistics by endpoint """
+
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._endpoints.items()}
+
+    def totals(self):
+        """ Return the statistics summed over all endpoints """
+
+        totals = {'requests': 0, 'wire_bytes': 0, 'decoded_bytes': 0, 'compressed': 0}
+
+        for stats in self.stats().values():
+            for key in totals:
+                totals[key] += stats[key]
+
+        return totals
+
+    def report(self):
+        """ Return a table of the endpoints, largest transfer first """
+
+        lines = ['{:<40} {:>8} {:>12} {:>12}'.format('endpoint', 'requests', 'wire', 'decoded')]
+
+        endpoints = sorted(self.stats().items(), key=lambda item: item[1]['wire_bytes'], reverse=True)
+
+        for name, stats in endpoints:
+            lines.append('{:<40} {:>8} {:>12} {:>12}'.format(
+                name, stats['requests'], stats['wire_bytes'], stats['decoded_bytes']
+            ))
+
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+The retry module provides the retry policy and circuit breaker used by
+InvenTreeAPI for every request.
+"""
+
+
+import email.utils
+import logging
+import random
+import threading
+import time
+
+import requests
+
+
+logger = logging.getLogger('inventree')
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """ Raised instead of sending a request while the server is considered down """
+
+
+class RetryPolicy(object):
+    """
+    Decides if and when a failed request is sent again.
+
+    Only idempotent methods are retried after connection errors or server errors.
+    A '429 Too Many Requests' answer is retried for every method, as the request
+    was not processed. Requests uploading files are never retried.
+    """
+
+    IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+    RETRY_STATUS = frozenset([429, 502, 503, 504])
+
+    def __init__(self, max_retries=2, backoff_factor=0.5, max_backoff=30, max_retry_after=60, jitter=True):
+        """ Create a policy
+
+        Args:
+            max_retries - Number of retries after the first attempt (0 = never retry)
+            backoff_factor - Delay before the first retry, doubled for every further retry
+            max_backoff - Max. delay between two attempts
+            max_retry_after - Max. delay accepted from a Retry-After header
+            jitter - Randomize the delay ('full jitter'), so clients do not retry in lockstep
+        """
+
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.jitter = jitter
+
+    def should_retry(self, method, attempt, response=None, error=None, files=None):
+        """ Return True if the request should be sent again
+
+        Args:
+            method - HTTP method (upper case)
+            attempt - Number of retries done so far
+            response - Response of the last attempt
+            error - Exception raised by the last attempt
+            files - Files uploaded with the request
+        """
+
+        if attempt >= self.max_retries or files:
+            return False
+
+        if error is not None:
+            return method in self.IDEMPOTENT_METHODS and isinstance(
+                error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+            )
+
+        if response is None or response.status_code not in self.RETRY_STATUS:
+            return False
+
+        return response.status_code == 429 or method in self.IDEMPOTENT_METHODS
+
+    def delay(self, attempt, response=None):
+        """ Return the seconds to wait before the next attempt """
+
+        retry_after = self.retry_after(response)
+
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+
+        delay = min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        return delay
+
+    @staticmethod
+    def retry_after(response):
+        """ Return the delay requested by a Retry-After header (seconds or HTTP date) """
+
+        if response is None:
+            return None
+
+        value = response.headers.get('Retry-After')
+
+        if not value:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+        return max(0.0, date.timestamp() - time.time())
+
+
+class CircuitBreaker(object):
+    """
+    Fails fast while the server is down.
+
+    After 'failure_threshold' failures in a row (connection errors or 5xx answers)
+    the circuit opens and requests raise CircuitOpenError without being sent.
+    After 'recovery_timeout' seconds a single request is let through - if it
+    succeeds the circuit closes again, otherwise it stays open.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        """ Create a closed circuit
+
+        Args:
+            failure_threshold - Failures in a row that open the circuit
+            recovery_timeout - Seconds before a request is let through again
+        """
+
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0.0
+
+        # Number of requests rejected while open
+        self.rejected = 0
+
+        self._lock = threading.Lock()
+
+    def before(self):
+        """ Call before sending a request - raises CircuitOpenError while open """
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            if self.state == self.OPEN and time.monotonic() - self.opened >= self.recovery_timeout:
+                # Let one request probe the server
+                self.state = self.HALF_OPEN
+                return
+
+            self.rejected += 1
+
+        raise CircuitOpenError("InvenTree server unavailable - not sending requests for {s:.0f}s".format(
+            s=max(0.0, self.recovery_timeout - (time.monotonic() - self.opened))
+        ))
+
+    def success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("InvenTree server available again")
+
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("InvenTree server unavailable after {n} failures".format(n=self.failures))
+
+                self.state = self.OPEN
+                self.opened = time.monotonic()
+
+    def abort(self):
+        """ Call if a request failed for a reason unrelated to the server
+
+        A half-open circuit lets the next request probe the server instead.
+        """
+
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened = time.monotonic() - self.recovery_timeout
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""
+The throttle module provides a client-side rate limiter, which keeps bulk
+operations of an InvenTreeAPI from overloading the server.
+"""
+
+
+import collections
+import threading
+import time
+
+
+class Throttle(object):
+    """
+    Token-bucket rate limit and max. number of requests in flight.
+
+    Every request takes one token, tokens are refilled at 'rate' per second up
+    to 'burst'. A request that finds the bucket empty reserves the next token
+    and waits for it, so waiting requests are served in order.
+    Requests in flight are counted until the response was received, requests
+    waiting for a free slot are served first come, first served.
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        """ Create a throttle
+
+        Args:
+            rate - Requests per second (default = None - no rate limit)
+            burst - Requests that may be sent at once after a pause (default = rate, min. 1)
+            max_in_flight - Max. number of requests sent at the same time (default = None - no limit)
+        """
+
+        self.rate = rate or None
+        self.burst = max(1, burst or rate or 1)
+        self.max_in_flight = max_in_flight or None
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self._in_flight = 0
+        self._waiting = collections.deque()
+        self._slot_freed = threading.Condition(self._lock)
+
+        self.requests = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    def acquire(self):
+        """ Wait until a request may be sent - returns the seconds waited
+
+        release() must be called when the response was received.
+        """
+
+        start = time.monotonic()
+
+        if self.rate:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                # Reserve a token, a negative balance is the queue of waiting requests
+                self._tokens -= 1
+                wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            if wait > 0:
+                time.sleep(wait)
+
+        with self._lock:
+            if self.max_in_flight:
+                self._take_slot()
+
+            waited = time.monotonic() - start
+
+            self.requests += 1
+
+            # Ignore the scheduling noise of an uncontended acquire
+            if waited > 0.001:
+                self.throttled += 1
+                self.throttled_seconds += waited
+
+        return waited
+
+    def release(self):
+        """ Free the slot taken by acquire() """
+
+        if self.max_in_flight:
+            with self._lock:
+                self._in_flight -= 1
+                self._slot_freed.notify_all()
+
+    def _take_slot(self):
+        """ Wait for a free slot in order of arrival (lock must be held) """
+
+        if self._in_flight >= self.max_in_flight or self._waiting:
+            ticket = object()
+            self._waiting.append(ticket)
+
+            self._slot_freed.wait_for(lambda: self._waiting[0] is ticket and self._in_flight < self.max_in_flight)
+
+            self._waiting.popleft()
+
+            # The next request in line may fit as well
+            self._slot_freed.notify_all()
+
+        self._in_flight += 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    def stats(self):
+        """ Return the number of requests and the time they spent throttled """
+
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'throttled_seconds': self.throttled_seconds,
+            }
+
+    def clear(self):
+        """ Reset the counters """
+
+        with self._lock:
+            self.requests = 0
+            self.throttled = 0
+            self.throttled_seconds = 0.0
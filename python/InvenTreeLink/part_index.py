@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+import time
+
+
+class PartIndex:
+    """ persistent index fusion-id -> InvenTree part-pk, kept per server section """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS part_index ('
+        ' server TEXT NOT NULL,'
+        ' fusion_id TEXT NOT NULL,'
+        ' revision_id TEXT,'
+        ' part_pk INTEGER,'
+        ' seen REAL NOT NULL,'
+        ' PRIMARY KEY (server, fusion_id))'
+    )
+
+    def __init__(self, path, server, max_age=3600, linked_max_age=86400):
+        """
+        path - location of the index file
+        server - name of the server section the entries belong to
+        max_age - seconds after which unlinked entries are checked again
+        linked_max_age - seconds after which linked entries are checked again (parts deleted or re-linked on the server)
+        """
+        self.path = path
+        self.server = server
+        self.max_age = max_age
+        self.linked_max_age = linked_max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(self.SCHEMA)
+
+    def lookup(self, components, unlinked=True):
+        """
+        resolves (fusion-id, revision-id) pairs from the index
+
+        unlinked - also trust fresh entries without a part, otherwise they must be checked against the server
+        returns a dict fusion-id -> part-pk (False if unlinked) for all fresh entries
+        and a list of the fusion-ids that must be checked against the server
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT fusion_id, revision_id, part_pk, seen FROM part_index WHERE server = ?',
+                (self.server, )
+            ).fetchall()
+        known = {row[0]: row[1:] for row in rows}
+
+        now = time.time()
+        found, missing = {}, []
+        for fusion_id, revision_id in components:
+            entry = known.get(fusion_id)
+            if entry is None or entry[0] != revision_id:
+                missing.append(fusion_id)
+            elif now - entry[2] > (self.max_age if entry[1] is None else self.linked_max_age):
+                missing.append(fusion_id)
+            elif entry[1] is None and not unlinked:
+                missing.append(fusion_id)
+            else:
+                found[fusion_id] = entry[1] or False
+        return found, missing
+
+    def offline(self, fusion_ids):
+        """ returns the last known part-pk for fusion-ids, ignoring revisions and age """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT fusion_id, part_pk FROM part_index WHERE server = ?',
+                (self.server, )
+            ).fetchall()
+        known = dict(rows)
+        return {fusion_id: known.get(fusion_id) or False for fusion_id in fusion_ids}
+
+    def update(self, components, index):
+        """ saves the server-state of (fusion-id, revision-id) pairs based on an id-index """
+        now = time.time()
+        rows = [
+            (self.server, fusion_id, revision_id, index.get(fusion_id), now)
+            for fusion_id, revision_id in components
+        ]
+        with self._lock, self._db:
+            self._db.executemany('INSERT OR REPLACE INTO part_index VALUES (?, ?, ?, ?, ?)', rows)
+
+    def record(self, fusion_id, revision_id, part_pk):
+        """ saves a single link - e.g. after a part was created """
+        self.update([(fusion_id, revision_id)], {fusion_id: part_pk})
+
+    def clear(self):
+        """ drops all entries of the server section """
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM part_index WHERE server = ?', (self.server, ))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
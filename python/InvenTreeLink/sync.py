@@ -0,0 +1,165 @@
+import time
+
+from . import config
+from . import functions
+
+
+class SyncEngine:
+    """ creates InvenTree parts for every unlinked component in the design
+
+    the Fusion side (reading physical properties) runs on the UI thread and hands every component
+    to the job executor as soon as it is read, so extraction and the network requests overlap
+    """
+
+    def __init__(self, on_report=None, on_progress=None):
+        """
+        on_report - called with the report dict when a plan or run is finished
+        on_progress - called with (value, message) while parts are created
+        """
+        self.on_report = on_report
+        self.on_progress = on_progress
+        self.dry_run = False
+        self.plan = []
+        self.results = {}
+        self.total = 0
+        self.pending = 0
+        self.completed = 0
+        self.started = None
+
+    # region planning
+    def start(self, dry_run=False):
+        """ plans the sync for the active design and runs it - must be called on the UI thread """
+        self.dry_run = dry_run
+        rows = functions.extract_bom()
+        components = {row['id']: row for row in rows}
+
+        def on_done(unlinked):
+            self.plan = [components[fusion_id] for fusion_id in unlinked]
+            if self.dry_run:
+                self.report()
+            else:
+                self.run(self.plan)
+
+        config.JOBS.submit(
+            self.find_unlinked,
+            [(row['id'], row['revision-id']) for row in rows],
+            on_done=on_done,
+        )
+
+    @staticmethod
+    def find_unlinked(job, components):
+        """ returns the fusion-ids of all components without a part - runs on a worker thread
+
+        a part may have been linked from another workstation since the index was updated,
+        so everything that looks unlinked is checked against the server before it is created
+        """
+        status = functions.inventree_link_status(components, verify_unlinked=True)
+        return [fusion_id for fusion_id, part_pk in status.items() if not part_pk]
+    # endregion
+
+    # region running
+    def run(self, rows):
+        """ creates parts for bom rows - must be called on the UI thread """
+        self.results = {}
+        self.total = self.pending = len(rows)
+        self.completed = 0
+        self.started = time.time()
+        if not rows:
+            self.report()
+
+        for row in rows:
+            comp = row['component']
+            part_kargs, parameters = functions.part_details(comp, comp)
+            self.submit(row, part_kargs, parameters)
+
+    def submit(self, row, part_kargs, parameters, create=functions.create_part):
+        config.JOBS.submit(
+            create,
+            part_kargs,
+            parameters,
+            row['id'],
+            row['revision-id'],
+            on_done=lambda result: self.done(row, part_kargs, parameters, *result),
+            on_error=lambda _e: self.done(row, part_kargs, parameters, None, '', [('part', str(_e))]),
+        )
+
+    def retry(self):
+        """ retries everything that failed in the last run - parts that were created are not created again
+
+        parts whose creation failed are looked up first, the server may have created them anyway
+        """
+        failed = [result for result in self.results.values() if result['errors']]
+        self.total = self.pending = len(failed)
+        self.completed = 0
+        self.started = time.time()
+        if not failed:
+            self.report()
+
+        for result in failed:
+            if result['part'] is None:
+                self.submit(result['row'], result['part_kargs'], result['parameters'], create=functions.recover_part)
+            else:
+                config.JOBS.submit(
+                    self.retry_parameters,
+                    result,
+                    on_done=lambda errors, result=result: self.done(
+                        result['row'], result['part_kargs'], result['parameters'], result['part'], '', errors
+                    ),
+                    on_error=lambda _e, result=result: self.done(
+                        result['row'], result['part_kargs'], result['parameters'], result['part'], '',
+                        [(name, str(_e)) for name, _ in result['errors']]
+                    ),
+                )
+
+    @staticmethod
+    def retry_parameters(job, result):
+        """ creates the failed parameters of an existing part - runs on a worker thread """
+        names = {name for name, _ in result['errors']}
+        parameters = [(parameter, data) for parameter, data in result['parameters'] if parameter.value.name in names]
+        return functions.link_part(result['part'], parameters, result['row']['id'], result['row']['revision-id'])
+
+    def done(self, row, part_kargs, parameters, part, category, errors):
+        self.results[row['id']] = {
+            'row': row,
+            'part': part,
+            'part_kargs': part_kargs,
+            'parameters': parameters,
+            'errors': errors,
+        }
+        if part:
+            row['status'] = part.pk
+        if not errors:
+            self.completed += 1
+
+        self.pending -= 1
+        if self.on_progress:
+            self.on_progress(
+                1 - self.pending / self.total,
+                'Created {nbr} parts, {pending} pending'.format(nbr=self.completed, pending=self.pending)
+            )
+        if self.pending == 0:
+            self.report()
+    # endregion
+
+    def report(self):
+        """ sends the plan (dry-run) or the throughput of the last run """
+        if self.dry_run:
+            data = {
+                'dry_run': True,
+                'planned': len(self.plan),
+                'names': [row['name'] for row in self.plan],
+            }
+        else:
+            duration = time.time() - self.started
+            data = {
+                'dry_run': False,
+                'planned': len(self.plan),
+                'completed': self.completed,
+                'failed': len([result for result in self.results.values() if result['errors']]),
+                'seconds': round(duration, 2),
+                'rate': round(self.completed / duration, 2) if duration else 0,
+            }
+
+        if self.on_report:
+            self.on_report(data)
+        return data
@@ -0,0 +1,60 @@
+""" micro-benchmark of decoding JSON responses: response.text (charset sniffing) vs. decode_json (bytes)
+
+uses synthetic non-ASCII list payloads, no server is needed
+usage: python python/tools/bench_decode.py [rows ...]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'InvenTreeLink', 'lib'))
+
+import requests  # noqa: E402
+from inventree.api import decode_json  # noqa: E402
+
+
+def make_response(body, content_type):
+    """ returns a response as the session builds it from the headers """
+    response = requests.Response()
+    response._content = body
+    response.status_code = 200
+    response.headers = requests.structures.CaseInsensitiveDict({'content-type': content_type} if content_type else {})
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+def best_of(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(sizes=(1000, 10000, 50000)):
+    for rows in sizes:
+        data = [
+            {'pk': nbr, 'part': nbr, 'data': 'Größe %d µm' % nbr, 'description': 'x' * 40}
+            for nbr in range(rows)
+        ]
+        body = json.dumps(data, ensure_ascii=False).encode()
+        assert decode_json(make_response(body, None)) == data
+
+        print('{rows} rows, {mb:.1f} MB'.format(rows=rows, mb=len(body) / 1e6))
+        # the charset detection runs over the whole body, once is enough to see it
+        print('  response.text, no charset      {:9.1f} ms'.format(
+            best_of(lambda: json.loads(make_response(body, None).text), 1) * 1000
+        ))
+        print('  response.text, charset=utf-8   {:9.1f} ms'.format(
+            best_of(lambda: json.loads(make_response(body, 'application/json; charset=utf-8').text)) * 1000
+        ))
+        print('  decode_json                    {:9.1f} ms'.format(
+            best_of(lambda: decode_json(make_response(body, None))) * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main(*[[int(arg) for arg in sys.argv[1:]]] if sys.argv[1:] else [])
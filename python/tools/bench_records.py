@@ -0,0 +1,57 @@
+""" memory and attribute access benchmark of list results: InventreeObject per row vs. compact RecordBatch
+
+uses synthetic parameter rows, no server is needed
+usage: python python/tools/bench_records.py [rows]
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'InvenTreeLink', 'lib'))
+
+from inventree.base import Parameter, RecordBatch  # noqa: E402
+
+
+def allocated(build):
+    """ returns the result of build and the MB it keeps allocated """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size / 1e6
+
+
+def best_of(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(rows=100000):
+    payload = json.dumps([
+        {'pk': nbr, 'part': nbr, 'template': 1, 'data': 'fusion-id-%d' % nbr, 'data_numeric': None}
+        for nbr in range(rows)
+    ])
+
+    objects, objects_mb = allocated(lambda: [Parameter(None, data=data) for data in json.loads(payload)])
+    batch, batch_mb = allocated(lambda: RecordBatch(Parameter, None, json.loads(payload)))
+
+    print('{rows} rows'.format(rows=rows))
+    print('memory     objects {:8.1f} MB   records {:8.1f} MB'.format(objects_mb, batch_mb))
+    print('attribute  objects {:8.1f} ms   records {:8.1f} ms   column() {:6.1f} ms'.format(
+        best_of(lambda: [item.part for item in objects]) * 1000,
+        best_of(lambda: [item.part for item in batch]) * 1000,
+        best_of(lambda: batch.column('part')) * 1000,
+    ))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,203 @@
+""" benchmark of the design traversal against a synthetic occurrence tree
+
+counts the property accesses on Fusion API objects - each one is a call across the Fusion bridge -
+and the time needed to build the flat BOM and the tree nodes:
+    two-pass - the former extract_bom (allOccurrences) followed by make_component_tree (recursive walk)
+    single   - functions.traverse_design
+
+runs without Fusion 360, adsk and apper are replaced by stand-ins
+usage: python python/tools/bench_traversal.py [components] [depth] [fan-out]
+"""
+import os
+import random
+import sys
+import time
+import types
+
+ACCESSES = [0]
+
+
+# region occurrence tree stand-in
+class Counted:
+    """ counts every public attribute read, like a call into the Fusion API """
+
+    def __getattribute__(self, name):
+        if not name.startswith('_'):
+            ACCESSES[0] += 1
+        return object.__getattribute__(self, name)
+
+
+class Collection(Counted):
+    def __init__(self, items):
+        self._items = items
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def __iter__(self):
+        for item in self._items:
+            ACCESSES[0] += 1
+            yield item
+
+
+class Body(Counted):
+    def __init__(self):
+        self.isSolid = True
+        self.volume = 1.0
+
+
+class Component(Counted):
+    def __init__(self, nbr):
+        self.name = 'component %d' % nbr
+        self.partNumber = 'P-%d' % nbr
+        self.id = 'id-%d' % nbr
+        self.revisionId = 'rev-%d' % nbr
+        self.description = ''
+        self.material = None
+        self.bRepBodies = Collection([Body(), Body()])
+        self.occurrences = Collection([])
+        self.allOccurrences = Collection([])
+
+
+class Occurrence(Counted):
+    def __init__(self, component, path, context):
+        self.component = component
+        self.fullPathName = path
+        self.assemblyContext = context
+        self.isReferencedComponent = False
+        self.childOccurrences = Collection([])
+
+
+class Design(Counted):
+    def __init__(self, root):
+        self.rootComponent = root
+
+
+def build_design(components=200, depth=4, fan=5, seed=1):
+    """ returns a design with fan occurrences per assembly, depth levels deep, of randomly reused components """
+    rnd = random.Random(seed)
+    pool = [Component(nbr) for nbr in range(components)]
+    all_occurrences = []
+
+    def make(level, path, context):
+        occurrences = []
+        for nbr in range(fan):
+            comp = rnd.choice(pool)
+            occ = Occurrence(comp, (path + '+' if path else '') + '%s:%d' % (comp.name, nbr), context)
+            all_occurrences.append(occ)
+            if level < depth:
+                object.__setattr__(occ, 'childOccurrences', Collection(make(level + 1, occ.fullPathName, occ)))
+            occurrences.append(occ)
+        return occurrences
+
+    root = Component(-1)
+    object.__setattr__(root, 'occurrences', Collection(make(1, '', None)))
+    object.__setattr__(root, 'allOccurrences', Collection(all_occurrences))
+    return Design(root), len(all_occurrences)
+# endregion
+
+
+# region module stand-ins
+CURRENT = {}
+
+
+def install_stand_ins():
+    """ makes functions.py importable without Fusion 360 """
+    class Anything:
+        def __getattr__(self, name):
+            return Anything()
+
+    for name in ('adsk', 'adsk.core', 'adsk.fusion', 'adsk.cam'):
+        module = types.ModuleType(name)
+        module.__getattr__ = lambda attr: Anything()
+        sys.modules[name] = module
+
+    class AppObjects:
+        def __init__(self):
+            self.product = CURRENT.get('design')
+            self.root_comp = self.product.rootComponent if self.product else None
+            self.ui = None
+
+    apper = types.ModuleType('InvenTreeLink.apper.apper')
+    apper.lib_import = lambda path: (lambda fn: fn)
+    apper.AppObjects = AppObjects
+    package = types.ModuleType('InvenTreeLink.apper')
+    package.apper = apper
+    sys.modules['InvenTreeLink.apper'] = package
+    sys.modules['InvenTreeLink.apper.apper'] = apper
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# endregion
+
+
+# region two-pass baseline
+def two_pass(functions):
+    """ the former extract_bom followed by make_component_tree """
+    root = CURRENT['design'].rootComponent
+
+    bom = {}
+    for occ in root.allOccurrences:
+        comp = occ.component
+        node = bom.get(comp.id)
+        if node:
+            node['instances'] += 1
+        else:
+            volume = 0
+            for body in comp.bRepBodies:
+                if body.isSolid:
+                    volume += body.volume
+            node = functions.component_info(comp, comp_set=True)
+            node['volume'] = volume
+            node['linked'] = occ.isReferencedComponent
+            bom[node['id']] = node
+
+    node_list = [functions.component_info(root)]
+
+    def make_assembly_nodes(occurrences, parent):
+        for occurrence in occurrences:
+            node = functions.component_info(occurrence.component, parent)
+            if occurrence.childOccurrences.count > 0:
+                node['type'] = '4-component_group'
+                node_list.append(node)
+                make_assembly_nodes(occurrence.childOccurrences, occurrence.component.id)
+            else:
+                node['type'] = '4-component'
+                node_list.append(node)
+
+    if root.occurrences.count > 0:
+        make_assembly_nodes(root.occurrences, root.id)
+
+    return list(bom.values()), node_list
+# endregion
+
+
+def measure(fn):
+    ACCESSES[0] = 0
+    start = time.perf_counter()
+    bom, nodes = fn()[:2]
+    return ACCESSES[0], time.perf_counter() - start, len(bom), len(nodes)
+
+
+def main(components=200, depth=4, fan=5):
+    install_stand_ins()
+    from InvenTreeLink import functions
+
+    CURRENT['design'], occurrences = build_design(components, depth, fan)
+    print('{occ} occurrences of {comp} components, depth {depth}, fan-out {fan}'.format(
+        occ=occurrences, comp=components, depth=depth, fan=fan
+    ))
+
+    results = [
+        ('two-pass', measure(lambda: two_pass(functions))),
+        ('single', measure(functions.traverse_design)),
+    ]
+    for name, (accesses, seconds, rows, nodes) in results:
+        print('{name:<10} {accesses:>9} accesses {ms:>9.1f} ms  {rows} bom rows, {nodes} tree nodes'.format(
+            name=name, accesses=accesses, ms=seconds * 1000, rows=rows, nodes=nodes
+        ))
+    print('accesses reduced by {:.0%}'.format(1 - results[1][1][0] / results[0][1][0]))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:4]])